@@ -1,21 +1,89 @@
 import json
-from flask import Flask, request, jsonify, render_template, redirect, url_for, session
-from models import db, Participant, Match, Round, MatchResult, User
+import math
+import os
+import time
+import click
+from flask import Blueprint, Flask, current_app, g, request, jsonify, render_template, redirect, url_for, session
+from sqlalchemy.pool import StaticPool
+from models import db, Participant, Match, MatchSeat, Round, MatchResult, User
 import swiss
-
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///tournament.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = 'tournament-secret-key-2024'
-
-db.init_app(app)
+import migrations
+import cache
+import engine_config
+import events
+import metrics
+import session_claims
+import roster
+import passwords
+
+bp = Blueprint('main', __name__, cli_group=None)
+
+
+def create_app(config=None):
+    """Create and configure the application.
+
+    ``config`` is a mapping applied over the defaults (e.g. a different
+    SQLALCHEMY_DATABASE_URI for tests); an INSTANCE_PATH entry relocates
+    the instance folder holding the database, data_version and event log.
+    Does no database work, so every WSGI worker and CLI invocation can
+    call it cheaply; run init_db() (or ``flask init-db``) once per server
+    start before serving requests.
+    """
+    started = time.perf_counter()
+
+    app = Flask(__name__, instance_path=(config or {}).get('INSTANCE_PATH'))
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///tournament.db'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'tournament-secret-key-2024'
+    # Seconds create_app may take before a slow-startup warning is logged
+    app.config['STARTUP_TIME_BUDGET'] = 0.5
+    # Seconds pairing a round may spend reducing rematches
+    app.config['PAIRING_TIME_BUDGET'] = swiss.PAIRING_TIME_BUDGET
+    if config:
+        app.config.update(config)
+
+    engine_config.init_app(app)
+    db.init_app(app)
+    cache.init_app(app)
+    events.init_app(app)
+    metrics.init_app(app)
+    session_claims.init_app(app)
+    passwords.init_app(app)
+
+    app.register_blueprint(bp)
+
+    elapsed = time.perf_counter() - started
+    if elapsed > app.config['STARTUP_TIME_BUDGET']:
+        app.logger.warning('create_app took %.3fs (budget %.3fs)',
+                           elapsed, app.config['STARTUP_TIME_BUDGET'])
+    return app
 
 
 def get_current_user():
-    """Get the current logged-in user."""
-    if 'user_id' in session:
-        return User.query.get(session['user_id'])
-    return None
+    """Get the current logged-in User, loaded at most once per request."""
+    if 'current_user' not in g:
+        user_id = session.get('user_id')
+        g.current_user = User.query.get(user_id) if user_id is not None else None
+    return g.current_user
+
+
+def get_current_identity():
+    """Get who is logged in (id, is_admin, is_approved, participant_id).
+
+    Resolved once per request. With SESSION_CLAIMS enabled, current signed
+    session claims answer this without a database query; otherwise the
+    User row is loaded through get_current_user() (and the claims renewed).
+    Use get_current_user() instead when the User model itself is needed.
+    """
+    if 'current_identity' not in g:
+        identity = session_claims.load(session)
+        if identity is None:
+            user = get_current_user()
+            if user:
+                identity = session_claims.identity_from_user(user)
+                session_claims.store(session, user)
+        g.current_identity = identity
+    return g.current_identity
 
 
 def login_required(f):
@@ -23,7 +91,7 @@ def login_required(f):
     from functools import wraps
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if not get_current_user():
+        if not get_current_identity():
             return jsonify({'error': 'Login required'}), 401
         return f(*args, **kwargs)
     return decorated_function
@@ -34,7 +102,7 @@ def admin_required(f):
     from functools import wraps
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        user = get_current_user()
+        user = get_current_identity()
         if not user:
             return jsonify({'error': 'Login required'}), 401
         if not user.is_admin:
@@ -48,7 +116,7 @@ def user_participant_required(f):
     from functools import wraps
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        user = get_current_user()
+        user = get_current_identity()
         if not user:
             return jsonify({'error': 'Login required'}), 401
         
@@ -65,49 +133,55 @@ def user_participant_required(f):
     return decorated_function
 
 
-@app.route('/')
+@bp.errorhandler(passwords.PasswordPoolBusy)
+def password_pool_busy(e):
+    """Answer 503 when the password hashing queue is full."""
+    response = jsonify({'error': 'Server is busy. Please try again in a moment.'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
+def _too_many_attempts(delay):
+    response = jsonify({'error': 'Too many failed attempts. Please try again later.'})
+    response.headers['Retry-After'] = str(math.ceil(delay))
+    return response, 429
+
+
+@bp.route('/')
 def index():
     """Main page with tab-based interface."""
     # Check if user is logged in
-    if not get_current_user():
+    if not get_current_identity():
         return render_template('login.html')
     return render_template('index.html')
 
 
-@app.route('/api/participants', methods=['GET', 'POST'])
+@bp.route('/api/participants', methods=['GET', 'POST'])
 def participants():
     """Handle participant CRUD operations."""
-    user = get_current_user()
+    user = get_current_identity()
 
     if request.method == 'GET':
-        from models import MatchResult
-
         # All logged-in users can see participants of approved users only
-        if user:
-            # Get participants that are linked to approved users
-            participants = Participant.query.join(User).filter(User.is_approved == True).all()
-        else:
-            participants = []
-
-        result = []
-        for p in participants:
-            # Calculate totals from MatchResult for this participant
-            stats = db.session.query(
-                db.func.coalesce(db.func.sum(MatchResult.win), 0).label('total_win'),
-                db.func.coalesce(db.func.sum(MatchResult.loss), 0).label('total_loss'),
-                db.func.coalesce(db.func.sum(MatchResult.draw), 0).label('total_draw'),
-                db.func.coalesce(db.func.sum(MatchResult.points), 0).label('total_points')
-            ).filter(MatchResult.player_id == p.id).first()
-
-            result.append({
-                'id': p.id,
-                'name': p.name,
-                'win_count': stats.total_win,
-                'loss_count': stats.total_loss,
-                'draw_count': stats.total_draw,
-                'points': stats.total_points
-            })
-        return jsonify(result)
+        if not user:
+            return jsonify([])
+
+        def build():
+            rows = sorted(swiss.get_standings_with_stats(), key=lambda row: row['participant'].id)
+            result = []
+            for row in rows:
+                p = row['participant']
+                result.append({
+                    'id': p.id,
+                    'name': p.name,
+                    'win_count': row['win_count'],
+                    'loss_count': row['loss_count'],
+                    'draw_count': row['draw_count'],
+                    'points': row['points']
+                })
+            return jsonify(result)
+
+        return cache.cached_json('participants', build)
 
     elif request.method == 'POST':
         # Require login for adding participants
@@ -124,46 +198,82 @@ def participants():
         if not name:
             return jsonify({'error': 'Name is required'}), 400
 
+        # 遅いハッシュ計算は書き込みロックを取る前に済ませる
+        password_hash = passwords.hash_password(roster.default_password(name))
+        engine_config.begin_write()
+
         participant = Participant(name=name)
         db.session.add(participant)
         db.session.flush()  # Get the participant ID
 
         # Create an associated approved user
         new_user = User(username=name)
-        new_user.set_password(name.lower().replace(' ', '') + '123')  # Default password
+        new_user.password_hash = password_hash
         new_user.is_admin = False
         new_user.is_approved = True  # Admin-added users are auto-approved
         new_user.participant_id = participant.id
         db.session.add(new_user)
 
         db.session.commit()
+        events.publish('participants_changed')
 
         return jsonify(participant.to_dict()), 201
 
 
-@app.route('/api/participants/<int:participant_id>', methods=['DELETE'])
+@bp.route('/api/participants/import', methods=['POST'])
+@admin_required
+def import_participants():
+    """Bulk-import participants from a CSV or JSON roster (admin only).
+
+    Accepts a multipart "file" upload (.csv or .json), a JSON body (a list
+    of names/objects or {"participants": [...]}) or a text/csv body. Each
+    new name gets an approved user with the default password; names that
+    already exist or repeat in the roster are reported and skipped.
+    """
+    try:
+        if 'file' in request.files:
+            upload = request.files['file']
+            fmt = 'json' if upload.filename.lower().endswith('.json') else 'csv'
+            entries = roster.parse_roster(upload.read().decode('utf-8-sig'), fmt)
+        elif request.is_json:
+            entries = roster.parse_roster(request.get_data(as_text=True), 'json')
+        else:
+            entries = roster.parse_roster(request.get_data(as_text=True), 'csv')
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'error': f'Invalid roster: {e}'}), 400
+
+    if not entries:
+        return jsonify({'error': 'Roster is empty'}), 400
+
+    report = roster.import_participants(entries, current_app.config.get('IMPORT_HASH_WORKERS'))
+    return jsonify(report), 201 if report['created'] else 200
+
+
+@bp.route('/api/participants/<int:participant_id>', methods=['DELETE'])
 def delete_participant(participant_id):
     """Delete a participant."""
-    user = get_current_user()
+    user = get_current_identity()
     if not user:
         return jsonify({'error': 'Login required'}), 401
     if not user.is_admin:
         return jsonify({'error': 'Admin access required'}), 403
 
+    engine_config.begin_write()
     participant = Participant.query.get(participant_id)
     if not participant:
         return jsonify({'error': 'Participant not found'}), 404
 
     db.session.delete(participant)
     db.session.commit()
+    events.publish('participants_changed')
 
     return jsonify({'message': 'Participant deleted'})
 
 
-@app.route('/api/matches/next', methods=['POST'])
+@bp.route('/api/matches/next', methods=['POST'])
 def generate_next_matches():
     """Generate the next round of Swiss-system matches."""
-    user = get_current_user()
+    user = get_current_identity()
     if not user:
         return jsonify({'error': 'Login required'}), 401
     if not user.is_admin:
@@ -171,16 +281,14 @@ def generate_next_matches():
 
     matches, round_obj = swiss.generate_next_round_matches()
 
+    # ids come back from the bulk insert, so no per-table re-query is needed
     match_data = []
     for match in matches:
-        match_obj = Match.query.filter_by(
-            round_id=round_obj.id,
-            table_number=match['table_number']
-        ).first()
+        real_player_ids = [pid for pid in match['player_ids'] if pid > 0]
         match_data.append({
-            'id': match_obj.id,
-            'table_number': match_obj.table_number,
-            'players': [match_obj.player1_id, match_obj.player2_id, match_obj.player3_id, match_obj.player4_id]
+            'id': match['id'],
+            'table_number': match['table_number'],
+            'players': (real_player_ids + [None] * 4)[:4]
         })
 
     return jsonify({
@@ -189,10 +297,10 @@ def generate_next_matches():
     })
 
 
-@app.route('/api/matches', methods=['POST'])
+@bp.route('/api/matches', methods=['POST'])
 def record_match():
     """Record or update match results."""
-    user = get_current_user()
+    user = get_current_identity()
     if not user:
         return jsonify({'error': 'Login required'}), 401
 
@@ -232,7 +340,7 @@ def record_match():
         if player_result is None:
             return jsonify({'error': 'Player result not found in submitted data'}), 400
         _, error = swiss.update_player_result(match_id, user.participant_id, player_result)
-    elif match and match.result_json is not None:
+    elif match and match.completed:
         # 管理者: 既存結果を全更新
         _, error = swiss.update_match_results(match_id, results)
     else:
@@ -248,10 +356,34 @@ def record_match():
     })
 
 
-@app.route('/api/matches/<int:match_id>', methods=['GET'])
+@bp.route('/api/matches/results:batch', methods=['POST'])
+@admin_required
+def record_match_results_batch():
+    """Record results for many tables at once (admin only).
+
+    Body: {"matches": [{"match_id": 1, "results": [...]}, ...]}. All entries
+    are validated and written in one transaction; if any entry is invalid
+    nothing is written and a 400 lists the per-match status.
+    """
+    data = request.get_json(silent=True) or {}
+    entries = data.get('matches')
+    if not isinstance(entries, list) or not entries:
+        return jsonify({'error': 'matches must be a non-empty list'}), 400
+
+    statuses, ok = swiss.record_results_batch(entries)
+    if not ok:
+        return jsonify({'error': 'No results were recorded', 'matches': statuses}), 400
+
+    return jsonify({
+        'message': f'Results recorded for {len(statuses)} matches',
+        'matches': statuses
+    })
+
+
+@bp.route('/api/matches/<int:match_id>', methods=['GET'])
 def get_match(match_id):
     """Get a specific match with its results."""
-    user = get_current_user()
+    user = get_current_identity()
     if not user:
         return jsonify({'error': 'Login required'}), 401
 
@@ -261,10 +393,31 @@ def get_match(match_id):
     return jsonify(match_data)
 
 
-@app.route('/api/matches/<int:match_id>/swap', methods=['POST'])
+# Seat index (0-3) used by the seating endpoints -> Match column
+_SLOT_FIELDS = {
+    0: 'player1_id',
+    1: 'player2_id',
+    2: 'player3_id',
+    3: 'player4_id'
+}
+
+
+def _seat_edit_error(match, slot):
+    """Return (error, status) if the seat cannot be edited, else None."""
+    # リストなどハッシュ不能な値で dict を引かないよう、先に型を確かめる
+    if not isinstance(slot, int) or isinstance(slot, bool) or slot not in _SLOT_FIELDS:
+        return 'Invalid slot number', 400
+    # Check if match has results (結果登録済みなら completed が立つ)
+    if match.completed:
+        return 'Results have been recorded. Cannot modify pairings.', 400
+    return None
+
+
+@bp.route('/api/matches/<int:match_id>/swap', methods=['POST'])
 @admin_required
 def swap_match_players(match_id):
     """Swap two players in a match."""
+    engine_config.begin_write()
     match = Match.query.get(match_id)
     if not match:
         return jsonify({'error': 'Match not found'}), 404
@@ -277,49 +430,43 @@ def swap_match_players(match_id):
         return jsonify({'error': 'Both slot1 and slot2 are required'}), 400
 
     # Validate slots
-    if slot1 < 0 or slot1 > 3 or slot2 < 0 or slot2 > 3:
-        return jsonify({'error': 'Invalid slot number'}), 400
+    for slot in (slot1, slot2):
+        error = _seat_edit_error(match, slot)
+        if error:
+            return jsonify({'error': error[0]}), error[1]
 
     if slot1 == slot2:
         return jsonify({'error': 'Cannot swap same slot'}), 400
 
-    # Get player IDs for each slot
-    slot_map = {
-        0: 'player1_id',
-        1: 'player2_id',
-        2: 'player3_id',
-        3: 'player4_id'
-    }
-
-    # Check if match has results (swiss.pyでresult_jsonがNoneのときに結果未記録と判定)
-    if match.result_json is not None:
-        return jsonify({'error': 'Results have been recorded. Cannot modify pairings.'}), 400
-
     # Get player IDs
-    player1_id = getattr(match, slot_map[slot1])
-    player2_id = getattr(match, slot_map[slot2])
+    player1_id = getattr(match, _SLOT_FIELDS[slot1])
+    player2_id = getattr(match, _SLOT_FIELDS[slot2])
 
     # If one slot is empty, just move the player to the other slot
     if player1_id is None:
-        setattr(match, slot_map[slot1], player2_id)
-        setattr(match, slot_map[slot2], None)
+        setattr(match, _SLOT_FIELDS[slot1], player2_id)
+        setattr(match, _SLOT_FIELDS[slot2], None)
     elif player2_id is None:
-        setattr(match, slot_map[slot1], player1_id)
-        setattr(match, slot_map[slot2], None)
+        setattr(match, _SLOT_FIELDS[slot1], player1_id)
+        setattr(match, _SLOT_FIELDS[slot2], None)
     else:
         # Swap player IDs
-        setattr(match, slot_map[slot1], player2_id)
-        setattr(match, slot_map[slot2], player1_id)
+        setattr(match, _SLOT_FIELDS[slot1], player2_id)
+        setattr(match, _SLOT_FIELDS[slot2], player1_id)
 
+    swiss.sync_match_seats(match)
+    round_id = match.round_id
     db.session.commit()
+    events.publish('seats_changed', match_id=match_id, round_id=round_id)
 
     return jsonify({'message': 'Players swapped successfully'})
 
 
-@app.route('/api/matches/<int:match_id>/update', methods=['POST'])
+@bp.route('/api/matches/<int:match_id>/update', methods=['POST'])
 @admin_required
 def update_match_player(match_id):
     """Update a specific player slot in a match."""
+    engine_config.begin_write()
     match = Match.query.get(match_id)
     if not match:
         return jsonify({'error': 'Match not found'}), 404
@@ -331,187 +478,262 @@ def update_match_player(match_id):
     if slot is None:
         return jsonify({'error': 'Slot is required'}), 400
 
-    # Validate slot
-    if slot < 0 or slot > 3:
-        return jsonify({'error': 'Invalid slot number'}), 400
-
-    # Check if match has results
-    if match.result_json is not None:
-        return jsonify({'error': 'Results have been recorded. Cannot modify pairings.'}), 400
+    # Validate slot and check if match has results
+    error = _seat_edit_error(match, slot)
+    if error:
+        return jsonify({'error': error[0]}), error[1]
 
     # Update player ID
-    slot_map = {
-        0: 'player1_id',
-        1: 'player2_id',
-        2: 'player3_id',
-        3: 'player4_id'
-    }
-
-    setattr(match, slot_map[slot], player_id)
+    setattr(match, _SLOT_FIELDS[slot], player_id)
+    swiss.sync_match_seats(match)
+    round_id = match.round_id
     db.session.commit()
+    events.publish('seats_changed', match_id=match_id, round_id=round_id)
 
     return jsonify({'message': 'Player updated successfully'})
 
 
-@app.route('/api/matches/current', methods=['GET'])
+@bp.route('/api/rounds/<int:round_id>/swap', methods=['POST'])
+@admin_required
+def swap_players_across_tables(round_id):
+    """Exchange two seated players between tables of a round (admin only).
+
+    Body: {"a": {"match_id": 1, "slot": 0, "player_id": 5}, "b": {...}} with
+    slots 0-3. player_id is optional; when given, the seat must still hold
+    that player or the swap is refused with 409. Both tables are updated in
+    one locked transaction and returned in the round-listing format.
+    """
+    data = request.get_json(silent=True) or {}
+    pairs = [data.get('a'), data.get('b')]
+    if not all(isinstance(pair, dict) and 'match_id' in pair and 'slot' in pair for pair in pairs):
+        return jsonify({'error': 'a and b must each have match_id and slot'}), 400
+    if not all(isinstance(pair['match_id'], int) and not isinstance(pair['match_id'], bool)
+               for pair in pairs):
+        return jsonify({'error': 'match_id must be an integer'}), 400
+    if (pairs[0]['match_id'], pairs[0]['slot']) == (pairs[1]['match_id'], pairs[1]['slot']):
+        return jsonify({'error': 'Cannot swap same slot'}), 400
+
+    # 2テーブル分の読み取りから書き込みまでを BEGIN IMMEDIATE の1トランザクションで行う
+    engine_config.begin_write()
+    matches = {m.id: m for m in Match.query.filter(
+        Match.id.in_([pair['match_id'] for pair in pairs]),
+        Match.round_id == round_id
+    ).all()}
+
+    seats = []
+    for pair in pairs:
+        match = matches.get(pair['match_id'])
+        if not match:
+            db.session.rollback()
+            return jsonify({'error': 'Match not found in this round'}), 404
+        error = _seat_edit_error(match, pair['slot'])
+        if error:
+            db.session.rollback()
+            return jsonify({'error': error[0]}), error[1]
+        field = _SLOT_FIELDS[pair['slot']]
+        if 'player_id' in pair and getattr(match, field) != pair['player_id']:
+            db.session.rollback()
+            return jsonify({'error': 'Seating has changed. Please reload and try again.'}), 409
+        seats.append((match, field, getattr(match, field)))
+
+    (match_a, field_a, player_a), (match_b, field_b, player_b) = seats
+    setattr(match_a, field_a, player_b)
+    setattr(match_b, field_b, player_a)
+    for match in matches.values():
+        swiss.sync_match_seats(match)
+    match_ids = sorted(matches)
+    db.session.commit()
+    for match_id in match_ids:
+        events.publish('seats_changed', match_id=match_id, round_id=round_id)
+
+    # 更新後の両テーブルを返し、UI が再取得せずに描画できるようにする
+    updated = Match.query.options(
+        db.joinedload(Match.player1),
+        db.joinedload(Match.player2),
+        db.joinedload(Match.player3),
+        db.joinedload(Match.player4)
+    ).filter(Match.id.in_(match_ids)).order_by(Match.table_number).all()
+
+    return jsonify({
+        'message': 'Players swapped successfully',
+        'matches': [swiss.serialize_match_summary(m) for m in updated]
+    })
+
+
+@bp.route('/api/matches/current', methods=['GET'])
 def get_current_matches():
     """Get matches from the current/last round."""
-    user = get_current_user()
+    user = get_current_identity()
     if not user:
         return jsonify({'error': 'Login required'}), 401
 
-    matches, round_obj = swiss.get_active_matches()
-
-    match_data = []
-    for match in matches:
-        players = []
-        if match.player1_id:
-            p = Participant.query.get(match.player1_id)
-            players.append({'id': p.id, 'name': p.name} if p else {'id': None, 'name': 'TBD'})
-        if match.player2_id:
-            p = Participant.query.get(match.player2_id)
-            players.append({'id': p.id, 'name': p.name} if p else {'id': None, 'name': 'TBD'})
-        if match.player3_id:
-            p = Participant.query.get(match.player3_id)
-            players.append({'id': p.id, 'name': p.name} if p else {'id': None, 'name': 'TBD'})
-        if match.player4_id:
-            p = Participant.query.get(match.player4_id)
-            players.append({'id': p.id, 'name': p.name} if p else {'id': None, 'name': 'TBD'})
-
-        match_data.append({
-            'id': match.id,
-            'table_number': match.table_number,
-            'players': players,
-            'completed': match.result_json is not None
-        })
+    match_data, round_number = swiss.get_active_matches()
 
     return jsonify({
-        'round': round_obj.round_number if round_obj else None,
+        'round': round_number,
         'matches': match_data
     })
 
 
-@app.route('/api/standings', methods=['GET'])
+@bp.route('/api/events', methods=['GET'])
+@login_required
+def event_stream():
+    """Server-Sent Events stream of tournament changes (results, rounds, seating)."""
+    return events.stream()
+
+
+@bp.route('/api/admin/metrics', methods=['GET', 'DELETE'])
+@admin_required
+def admin_metrics():
+    """Per-endpoint latency and SQL query summary for this worker (admin only).
+
+    DELETE clears the collected samples.
+    """
+    if request.method == 'DELETE':
+        metrics.reset()
+        return jsonify({'message': 'Metrics reset'})
+    return jsonify(metrics.summary())
+
+
+@bp.route('/api/standings', methods=['GET'])
 def get_standings():
     """Get current standings/rankings."""
-    user = get_current_user()
+    user = get_current_identity()
     if not user:
         return jsonify({'error': 'Login required'}), 401
 
-    from models import MatchResult, db
-
-    participants = swiss.get_standings()
-
-    standings = []
-    for i, p in enumerate(participants, 1):
-        # Check if participant is linked to an approved user
-        user = User.query.filter_by(participant_id=p.id).first()
-        if user and not user.is_approved:
-            continue
-
-        # Calculate totals from MatchResult for this participant
-        stats = db.session.query(
-            db.func.coalesce(db.func.sum(MatchResult.win), 0).label('total_win'),
-            db.func.coalesce(db.func.sum(MatchResult.loss), 0).label('total_loss'),
-            db.func.coalesce(db.func.sum(MatchResult.draw), 0).label('total_draw'),
-            db.func.coalesce(db.func.sum(MatchResult.points), 0).label('total_points')
-        ).filter(MatchResult.player_id == p.id).first()
-
-        standings.append({
-            'rank': len(standings) + 1,
-            'id': p.id,
-            'name': p.name,
-            'wins': stats.total_win,
-            'losses': stats.total_loss,
-            'draws': stats.total_draw,
-            'points': stats.total_points
-        })
+    def build():
+        standings = []
+        for row in swiss.get_standings_with_stats():
+            p = row['participant']
+            standings.append({
+                'rank': len(standings) + 1,
+                'id': p.id,
+                'name': p.name,
+                'wins': row['win_count'],
+                'losses': row['loss_count'],
+                'draws': row['draw_count'],
+                'points': row['points']
+            })
+        return jsonify(standings)
 
-    return jsonify(standings)
+    return cache.cached_json('standings', build)
 
 
-@app.route('/api/rounds', methods=['GET'])
+@bp.route('/api/rounds', methods=['GET'])
 def get_rounds():
     """Get all rounds with deletion status."""
-    user = get_current_user()
+    user = get_current_identity()
+    if not user:
+        return jsonify({'error': 'Login required'}), 401
+
+    def build():
+        # One grouped query: completed matches per round, answered from the
+        # (round_id, completed) index without reading match rows
+        rounds = db.session.query(
+            Round,
+            db.func.count(Match.id).filter(Match.completed).label('completed_matches')
+        ).outerjoin(
+            Match, Match.round_id == Round.id
+        ).group_by(Round.id).order_by(Round.round_number.desc()).all()
+
+        rounds_data = []
+        for r, completed_matches in rounds:
+            # Rounds can be deleted only while no match has results recorded
+            can_delete = (completed_matches == 0)
+            rounds_data.append({
+                'id': r.id,
+                'round_number': r.round_number,
+                'can_delete': can_delete,
+                'is_frozen': r.is_frozen
+            })
+        return jsonify(rounds_data)
+
+    return cache.cached_json('rounds', build)
+
+
+@bp.route('/api/rounds/<int:round_id>/full', methods=['GET'])
+def get_round_full(round_id):
+    """Get every match in a round with players and per-player results."""
+    user = get_current_identity()
     if not user:
         return jsonify({'error': 'Login required'}), 401
 
-    rounds = Round.query.order_by(Round.round_number.desc()).all()
-    rounds_data = []
-    for r in rounds:
-        # Check if any match has results recorded
-        total_matches = Match.query.filter_by(round_id=r.id).count()
-        matches_without_results = Match.query.filter(
-            Match.round_id == r.id,
-            Match.result_json == None
-        ).count()
-        can_delete = (matches_without_results == total_matches)
-        rounds_data.append({
-            'id': r.id,
-            'round_number': r.round_number,
-            'can_delete': can_delete,
-            'is_frozen': r.is_frozen
+    def build():
+        round_obj = Round.query.get(round_id)
+        if not round_obj:
+            return jsonify({'error': 'Round not found'}), 404
+        return jsonify({
+            'round_id': round_obj.id,
+            'round_number': round_obj.round_number,
+            'is_frozen': round_obj.is_frozen,
+            'matches': swiss.get_round_with_results(round_id)
         })
-    return jsonify(rounds_data)
+
+    return cache.cached_json(f'round_full:{round_id}', build)
 
 
-@app.route('/api/rounds/<int:round_id>/freeze', methods=['POST'])
+@bp.route('/api/rounds/<int:round_id>/freeze', methods=['POST'])
 @admin_required
 def toggle_freeze_round(round_id):
     """Toggle freeze status of a round (admin only)."""
+    engine_config.begin_write()
     round_obj = Round.query.get(round_id)
     if not round_obj:
         return jsonify({'error': 'Round not found'}), 404
 
-    round_obj.is_frozen = not round_obj.is_frozen
+    is_frozen = not round_obj.is_frozen
+    round_obj.is_frozen = is_frozen
     db.session.commit()
+    events.publish('round_frozen', round_id=round_id, is_frozen=is_frozen)
 
     return jsonify({
-        'message': 'フリーズ済み' if round_obj.is_frozen else 'フリーズ解除済み',
-        'is_frozen': round_obj.is_frozen
+        'message': 'フリーズ済み' if is_frozen else 'フリーズ解除済み',
+        'is_frozen': is_frozen
     })
 
 
-@app.route('/api/rounds/<int:round_id>', methods=['DELETE'])
+@bp.route('/api/rounds/<int:round_id>', methods=['DELETE'])
 @admin_required
 def delete_round(round_id):
     """Delete a round (only if no results have been recorded)."""
+    engine_config.begin_write()
     round_obj = Round.query.get(round_id)
     if not round_obj:
         return jsonify({'error': 'Round not found'}), 404
 
-    # Check if any matches in this round have results recorded
-    matches_with_results = Match.query.filter_by(
-        round_id=round_id,
-        result_json=None
-    ).count()
-
-    # If some matches have results (result_json is not None) and some don't
-    # We'll check if ANY match has results to prevent deletion
-    total_matches = Match.query.filter_by(round_id=round_id).count()
-    matches_without_results = Match.query.filter(
-        Match.round_id == round_id,
-        Match.result_json == None
-    ).count()
-
-    if matches_without_results < total_matches:
+    # Check if ANY match in this round has results recorded to prevent deletion
+    has_results = db.session.query(
+        Match.query.filter(Match.round_id == round_id, Match.completed).exists()
+    ).scalar()
+
+    if has_results:
         return jsonify({'error': 'Results have been recorded for this round. Deletion not allowed.'}), 400
 
-    # Delete all matches in this round first (cascade)
+    # Take any stray results out of the standings counters, then delete
+    # results and matches in this round first (cascade)
+    match_ids = db.session.query(Match.id).filter(Match.round_id == round_id)
+    round_results = MatchResult.query.filter(MatchResult.match_id.in_(match_ids)).all()
+    swiss.reverse_match_results(round_results)
+    MatchResult.query.filter(MatchResult.match_id.in_(match_ids)).delete(synchronize_session=False)
+    MatchSeat.query.filter(MatchSeat.match_id.in_(match_ids)).delete(synchronize_session=False)
     Match.query.filter_by(round_id=round_id).delete()
 
     # Delete the round
     db.session.delete(round_obj)
     db.session.commit()
+    events.publish('round_deleted', round_id=round_id)
 
     return jsonify({'message': 'Round deleted successfully'})
 
 
-@app.route('/api/players/<int:participant_id>/matches', methods=['GET'])
+@bp.route('/api/players/<int:participant_id>/matches', methods=['GET'])
 @user_participant_required
 def get_player_matches(participant_id):
-    """Get all matches for a specific player across all rounds."""
+    """Get all matches for a specific player across all rounds.
+
+    Optional ``?since_round=N`` returns only matches from rounds after N.
+    """
     participant = Participant.query.get(participant_id)
     if not participant:
         return jsonify({'error': 'Participant not found'}), 404
@@ -521,61 +743,59 @@ def get_player_matches(participant_id):
     if user and not user.is_approved:
         return jsonify({'error': 'Participant not approved'}), 403
 
-    matches = Match.query.filter(
-        (Match.player1_id == participant_id) |
-        (Match.player2_id == participant_id) |
-        (Match.player3_id == participant_id) |
-        (Match.player4_id == participant_id)
-    ).order_by(Match.round_id.desc(), Match.table_number.asc()).all()
+    # 1) この参加者の試合をラウンドと一緒に取得（?since_round=N でN回戦より後のみ）
+    query = db.session.query(Match, Round).join(
+        MatchSeat, MatchSeat.match_id == Match.id
+    ).outerjoin(
+        Round, Match.round_id == Round.id
+    ).filter(MatchSeat.participant_id == participant_id)
+    since_round = request.args.get('since_round', type=int)
+    if since_round is not None:
+        query = query.filter(Round.round_number > since_round)
+    rows = query.order_by(Match.round_id.desc(), Match.table_number.asc()).all()
+
+    # 2) 同卓した全プレイヤーを一括取得
+    seat_ids = {pid for match, _ in rows
+                for pid in (match.player1_id, match.player2_id, match.player3_id, match.player4_id)
+                if pid}
+    names = {}
+    if seat_ids:
+        names = dict(db.session.query(Participant.id, Participant.name).filter(
+            Participant.id.in_(seat_ids)
+        ).all())
+
+    # 3) 自分の結果を一括取得
+    own_results = {}
+    if rows:
+        own_results = {r.match_id: r for r in MatchResult.query.filter(
+            MatchResult.player_id == participant_id,
+            MatchResult.match_id.in_([match.id for match, _ in rows])
+        ).all()}
 
     matches_data = []
-    for match in matches:
-        round_obj = Round.query.get(match.round_id)
+    for match, round_obj in rows:
+        seats = [match.player1_id, match.player2_id, match.player3_id, match.player4_id]
 
         # プレイヤーがこの試合で何番プレイヤーか
-        player_slot = None
-        if match.player1_id == participant_id:
-            player_slot = 1
-        elif match.player2_id == participant_id:
-            player_slot = 2
-        elif match.player3_id == participant_id:
-            player_slot = 3
-        elif match.player4_id == participant_id:
-            player_slot = 4
-
-        # 相手プレイヤーの取得
-        opponents = []
-        if match.player1_id and match.player1_id != participant_id:
-            p = Participant.query.get(match.player1_id)
-            opponents.append(p.name if p else 'TBD')
-        if match.player2_id and match.player2_id != participant_id:
-            p = Participant.query.get(match.player2_id)
-            opponents.append(p.name if p else 'TBD')
-        if match.player3_id and match.player3_id != participant_id:
-            p = Participant.query.get(match.player3_id)
-            opponents.append(p.name if p else 'TBD')
-        if match.player4_id and match.player4_id != participant_id:
-            p = Participant.query.get(match.player4_id)
-            opponents.append(p.name if p else 'TBD')
-
-        # 全プレイヤー情報と自分の結果を取得
+        player_slot = seats.index(participant_id) + 1 if participant_id in seats else None
+
+        # 相手プレイヤー
+        opponents = [names.get(pid, 'TBD') for pid in seats if pid and pid != participant_id]
+
+        # 全プレイヤー情報と自分の結果
         players_info = []
-        for attr_name, player_id in [('player1', match.player1_id), ('player2', match.player2_id),
-                                      ('player3', match.player3_id), ('player4', match.player4_id)]:
+        for slot, player_id in enumerate(seats, 1):
             if player_id:
-                p = Participant.query.get(player_id)
-                player_info = {'id': player_id, 'name': p.name if p else 'TBD', 'slot': int(attr_name[-1])}
-
-                # 自分の結果を取得
-                if player_id == participant_id:
-                    result = MatchResult.query.filter_by(match_id=match.id, player_id=player_id).first()
-                    if result:
-                        player_info['result'] = {
-                            'win': result.win,
-                            'loss': result.loss,
-                            'draw': result.draw,
-                            'points': result.points
-                        }
+                player_info = {'id': player_id, 'name': names.get(player_id, 'TBD'), 'slot': slot}
+
+                result = own_results.get(match.id) if player_id == participant_id else None
+                if result:
+                    player_info['result'] = {
+                        'win': result.win,
+                        'loss': result.loss,
+                        'draw': result.draw,
+                        'points': result.points
+                    }
 
                 players_info.append(player_info)
 
@@ -586,34 +806,27 @@ def get_player_matches(participant_id):
             'table_number': match.table_number,
             'player_slot': player_slot,
             'opponents': opponents,
-            'completed': match.result_json is not None,
+            'completed': match.completed,
             'players': players_info,
-            'result': match.result_json,
+            'result': match.get_results(),
             'is_frozen': round_obj.is_frozen if round_obj else False
         })
 
-    # Calculate total stats for this participant from all matches
-    stats = db.session.query(
-        db.func.coalesce(db.func.sum(MatchResult.win), 0).label('total_win'),
-        db.func.coalesce(db.func.sum(MatchResult.loss), 0).label('total_loss'),
-        db.func.coalesce(db.func.sum(MatchResult.draw), 0).label('total_draw'),
-        db.func.coalesce(db.func.sum(MatchResult.points), 0).label('total_points')
-    ).filter(MatchResult.player_id == participant_id).first()
-
+    # Total stats are kept up to date on the participant row
     return jsonify({
         'player_id': participant.id,
         'player_name': participant.name,
         'matches': matches_data,
         'total_stats': {
-            'wins': stats.total_win,
-            'losses': stats.total_loss,
-            'draws': stats.total_draw,
-            'points': stats.total_points
+            'wins': participant.win_count or 0,
+            'losses': participant.loss_count or 0,
+            'draws': participant.draw_count or 0,
+            'points': participant.points or 0
         }
     })
 
 
-@app.route('/api/players/<int:participant_id>/round/<int:round_id>/match', methods=['POST'])
+@bp.route('/api/players/<int:participant_id>/round/<int:round_id>/match', methods=['POST'])
 @user_participant_required
 def update_player_match(participant_id, round_id):
     """Update or create match result for a player in a specific round."""
@@ -638,7 +851,7 @@ def update_player_match(participant_id, round_id):
         return jsonify({'error': 'Match not found'}), 404
 
     # フリーズされたラウンドは管理者以外は結果登録・修正不可
-    user = get_current_user()
+    user = get_current_identity()
     if not user.is_admin:
         round_obj = Round.query.get(round_id)
         if round_obj and round_obj.is_frozen:
@@ -650,7 +863,7 @@ def update_player_match(participant_id, round_id):
         if player_result is None:
             return jsonify({'error': 'Player result not found in submitted data'}), 400
         _, error = swiss.update_player_result(match.id, participant_id, player_result)
-    elif match.result_json is not None:
+    elif match.completed:
         # 管理者: 既存結果を全更新
         _, error = swiss.update_match_results(match.id, results)
     else:
@@ -666,139 +879,125 @@ def update_player_match(participant_id, round_id):
     })
 
 
-@app.route('/api/matches/round/<int:round_id>', methods=['GET'])
+@bp.route('/api/matches/round/<int:round_id>', methods=['GET'])
 def get_round_matches(round_id):
     """Get matches from a specific round."""
-    user = get_current_user()
+    user = get_current_identity()
     if not user:
         return jsonify({'error': 'Login required'}), 401
 
-    round_obj = Round.query.get(round_id)
-    if not round_obj:
-        return jsonify({'error': 'Round not found'}), 404
+    def build():
+        round_obj = Round.query.get(round_id)
+        if not round_obj:
+            return jsonify({'error': 'Round not found'}), 404
 
-    matches = Match.query.filter_by(round_id=round_id).order_by(Match.table_number).all()
+        matches, _ = swiss.get_matches_by_round(round_id)
 
-    match_data = []
-    for match in matches:
-        players = []
-        if match.player1_id:
-            p = Participant.query.get(match.player1_id)
-            players.append({'id': p.id, 'name': p.name} if p else {'id': None, 'name': 'TBD'})
-        if match.player2_id:
-            p = Participant.query.get(match.player2_id)
-            players.append({'id': p.id, 'name': p.name} if p else {'id': None, 'name': 'TBD'})
-        if match.player3_id:
-            p = Participant.query.get(match.player3_id)
-            players.append({'id': p.id, 'name': p.name} if p else {'id': None, 'name': 'TBD'})
-        if match.player4_id:
-            p = Participant.query.get(match.player4_id)
-            players.append({'id': p.id, 'name': p.name} if p else {'id': None, 'name': 'TBD'})
+        match_data = [swiss.serialize_match_summary(match) for match in matches]
 
-        match_data.append({
-            'id': match.id,
-            'table_number': match.table_number,
-            'players': players,
-            'completed': match.result_json is not None
+        return jsonify({
+            'round': round_obj.round_number,
+            'matches': match_data
         })
 
-    return jsonify({
-        'round': round_obj.round_number,
-        'matches': match_data
-    })
+    return cache.cached_json(f'round_matches:{round_id}', build)
 
 
-@app.route('/api/users/clear', methods=['POST'])
+@bp.route('/api/users/clear', methods=['POST'])
 @admin_required
 def clear_non_admin_users():
     """Delete all non-admin users and their associated participants."""
+    engine_config.begin_write()
     non_admin_users = User.query.filter_by(is_admin=False).all()
     for user in non_admin_users:
         if user.participant_id:
             participant = Participant.query.get(user.participant_id)
             if participant:
+                # The participant's own counters go away with the row
                 MatchResult.query.filter_by(player_id=participant.id).delete()
                 db.session.delete(participant)
         db.session.delete(user)
     db.session.commit()
+    session_claims.bump_auth_version()
+    events.publish('participants_changed')
     return jsonify({'message': f'{len(non_admin_users)}件のアカウントを削除しました'})
 
 
-@app.route('/api/clear', methods=['POST'])
+@bp.route('/api/clear', methods=['POST'])
 def clear_data():
     """Clear all tournament data (for testing)."""
-    user = get_current_user()
+    user = get_current_identity()
     if not user:
         return jsonify({'error': 'Login required'}), 401
     if not user.is_admin:
         return jsonify({'error': 'Admin access required'}), 403
 
+    engine_config.begin_write()
     MatchResult.query.delete()
+    MatchSeat.query.delete()
     Match.query.delete()
     Round.query.delete()
     Participant.query.delete()
     db.session.commit()
+    events.publish('cleared')
     return jsonify({'message': 'All data cleared'})
 
 
-with app.app_context():
-    db.create_all()
+def init_db(app):
+    """Create tables, apply migrations and seed the default users.
 
-    # 既存DBに is_frozen カラムを追加（新規DBはモデル定義で対応済み）
-    try:
-        db.session.execute(db.text(
-            'ALTER TABLE rounds ADD COLUMN is_frozen BOOLEAN NOT NULL DEFAULT 0'
-        ))
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
+    Run once per server start (the WSGI master process, ``flask init-db``
+    or python app.py), not in every worker or on import.
+    """
+    with app.app_context():
+        db.create_all()
 
-    # 既存DBに対してユニーク制約を追加（新規DBはモデル定義で対応済み）
-    # 既存の重複データがある場合は失敗するが、それ以降の重複は with_for_update で防ぐ
-    try:
-        db.session.execute(db.text(
-            'CREATE UNIQUE INDEX IF NOT EXISTS uq_match_result_match_player '
-            'ON match_results (match_id, player_id)'
-        ))
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
-
-    # Create default users if not exists
-    admin_user = User.query.filter_by(username='admin').first()
-    guest_user = User.query.filter_by(username='guest').first()
-
-    if admin_user is None:
-        # Admin user (full access, auto-approved)
-        admin_user = User(username='admin')
-        admin_user.set_password('admin123')
-        admin_user.is_admin = True
-        admin_user.is_approved = True
-        db.session.add(admin_user)
-
-    if guest_user is None:
-        # Guest user (view-only access, auto-approved)
-        guest_user = User(username='guest')
-        guest_user.set_password('guest123')
-        guest_user.is_admin = False
-        guest_user.is_approved = True
-        db.session.add(guest_user)
-
-    # Ensure permissions are set correctly
-    if admin_user:
-        admin_user.is_admin = True
-        admin_user.is_approved = True
-    if guest_user:
-        guest_user.is_admin = False
-        guest_user.is_approved = True
-        # Update password for guest if it was reset
-        if not guest_user.password_hash.startswith('pbkdf2:sha256'):
+        # 既存DBへのカラム・インデックス追加などのスキーマ移行を適用
+        if migrations.upgrade():
+            cache.bump_data_version()
+
+        # Create default users if not exists
+        admin_user = User.query.filter_by(username='admin').first()
+        guest_user = User.query.filter_by(username='guest').first()
+
+        if admin_user is None:
+            # Admin user (full access, auto-approved)
+            admin_user = User(username='admin')
+            admin_user.set_password('admin123')
+            admin_user.is_admin = True
+            admin_user.is_approved = True
+            db.session.add(admin_user)
+
+        if guest_user is None:
+            # Guest user (view-only access, auto-approved)
+            guest_user = User(username='guest')
             guest_user.set_password('guest123')
+            guest_user.is_admin = False
+            guest_user.is_approved = True
+            db.session.add(guest_user)
+
+        # Ensure permissions are set correctly
+        if admin_user:
+            admin_user.is_admin = True
+            admin_user.is_approved = True
+        if guest_user:
+            guest_user.is_admin = False
+            guest_user.is_approved = True
+            # Update password for guest if it was reset
+            if not guest_user.password_hash.startswith('pbkdf2:sha256'):
+                guest_user.set_password('guest123')
 
-    db.session.commit()
+        db.session.commit()
+        # 既定ユーザーの権限を補正した可能性があるので、発行済みのクレームは無効にする
+        session_claims.bump_auth_version()
+
+        # Workers forked after this must not inherit pooled connections.
+        # インメモリDBは StaticPool の1接続にしか存在しないので破棄しない
+        if not isinstance(db.engine.pool, StaticPool):
+            db.engine.dispose()
 
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     """Login page and authentication."""
     if request.method == 'POST':
@@ -809,13 +1008,30 @@ def login():
         if not username or not password:
             return jsonify({'error': 'Username and password required'}), 400
 
+        delay = passwords.throttle_delay(username)
+        if delay:
+            return _too_many_attempts(delay)
+
         user = User.query.filter_by(username=username).first()
-        if user and user.check_password(password):
+        password_hash = user.password_hash if user else None
+        # ハッシュ検証の待ち時間中にDB接続を握らないよう、読み取りトランザクションを閉じておく
+        db.session.commit()
+
+        if password_hash and passwords.verify_password(password_hash, password):
+            passwords.clear_failures(username)
             if not user.is_approved:
                 return jsonify({'error': 'Account not approved by admin yet'}), 403
+            # 設定と異なる方式・コストのハッシュはログイン成功時に作り直す
+            if passwords.needs_rehash(password_hash):
+                new_hash = passwords.hash_password(password)
+                engine_config.begin_write()
+                user.password_hash = new_hash
+                db.session.commit()
             session['user_id'] = user.id
+            session_claims.store(session, user)
             return jsonify({'message': 'Login successful'})
 
+        passwords.record_failure(username)
         return jsonify({'error': 'Invalid credentials'}), 401
 
     # For GET request, return login page (or info if using SPA)
@@ -825,7 +1041,7 @@ def login():
     })
 
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     """Registration page and endpoint."""
     if request.method == 'POST':
@@ -841,9 +1057,15 @@ def register():
         if existing_user:
             return jsonify({'error': 'Username already exists'}), 409
 
+        # 遅いハッシュ計算は書き込みロックを取る前に済ませ、ロック取得後に重複を再確認する
+        password_hash = passwords.hash_password(password)
+        engine_config.begin_write()
+        if User.query.filter_by(username=username).first():
+            return jsonify({'error': 'Username already exists'}), 409
+
         # Create the user
         user = User(username=username)
-        user.set_password(password)
+        user.password_hash = password_hash
         user.is_admin = False
         user.is_approved = False  # Needs admin approval
         
@@ -868,14 +1090,17 @@ def register():
     })
 
 
-@app.route('/logout', methods=['POST'])
+@bp.route('/logout', methods=['POST'])
 def logout():
     """Logout user."""
     session.pop('user_id', None)
+    session.pop('claims', None)
+    g.pop('current_user', None)
+    g.pop('current_identity', None)
     return jsonify({'message': 'Logged out'})
 
 
-@app.route('/api/me', methods=['GET'])
+@bp.route('/api/me', methods=['GET'])
 def get_current_user_info():
     """Get current user info."""
     user = get_current_user()
@@ -884,7 +1109,7 @@ def get_current_user_info():
     return jsonify({'error': 'Not authenticated'}), 401
 
 
-@app.route('/api/change_password', methods=['POST'])
+@bp.route('/api/change_password', methods=['POST'])
 @login_required
 def change_password():
     """Change password for the current user."""
@@ -896,24 +1121,30 @@ def change_password():
         return jsonify({'error': 'Both passwords are required'}), 400
 
     user = get_current_user()
-    if not user.check_password(current_password):
+    delay = passwords.throttle_delay(user.username)
+    if delay:
+        return _too_many_attempts(delay)
+    if not passwords.verify_password(user.password_hash, current_password):
+        passwords.record_failure(user.username)
         return jsonify({'error': 'Current password is incorrect'}), 401
 
-    user.set_password(new_password)
+    password_hash = passwords.hash_password(new_password)
+    engine_config.begin_write()
+    user.password_hash = password_hash
     db.session.commit()
 
     return jsonify({'message': 'Password changed successfully'})
 
 
-@app.route('/change_password', methods=['GET'])
+@bp.route('/change_password', methods=['GET'])
 def change_password_page():
     """Show password change page."""
-    if not get_current_user():
-        return redirect(url_for('index'))
+    if not get_current_identity():
+        return redirect(url_for('main.index'))
     return render_template('change_password.html')
 
 
-@app.route('/api/users', methods=['GET'])
+@bp.route('/api/users', methods=['GET'])
 @admin_required
 def get_users():
     """Get all users (admin only)."""
@@ -928,56 +1159,64 @@ def get_users():
     } for u in users])
 
 
-@app.route('/api/users/<int:user_id>', methods=['DELETE'])
+@bp.route('/api/users/<int:user_id>', methods=['DELETE'])
 @admin_required
 def delete_user(user_id):
     """Delete a user (admin only)."""
+    engine_config.begin_write()
     user = User.query.get(user_id)
     if not user:
         return jsonify({'error': 'User not found'}), 404
 
     db.session.delete(user)
     db.session.commit()
+    session_claims.bump_auth_version()
+    events.publish('participants_changed')
     return jsonify({'message': 'User deleted'})
 
 
-@app.route('/api/users/<int:user_id>/admin', methods=['POST'])
+@bp.route('/api/users/<int:user_id>/admin', methods=['POST'])
 @admin_required
 def toggle_admin(user_id):
     """Toggle admin status for a user."""
+    engine_config.begin_write()
     user = User.query.get(user_id)
     if not user:
         return jsonify({'error': 'User not found'}), 404
 
     # Prevent removing admin status from yourself
-    if user_id == get_current_user().id:
+    if user_id == get_current_identity().id:
         return jsonify({'error': 'Cannot change your own admin status'}), 400
 
     user.is_admin = not user.is_admin
     db.session.commit()
+    session_claims.bump_auth_version()
     return jsonify({'message': f"User {'promoted to' if user.is_admin else 'demoted from'} admin"})
 
 
-@app.route('/api/users/<int:user_id>/approve', methods=['POST'])
+@bp.route('/api/users/<int:user_id>/approve', methods=['POST'])
 @admin_required
 def approve_user(user_id):
     """Approve a user for login."""
+    engine_config.begin_write()
     user = User.query.get(user_id)
     if not user:
         return jsonify({'error': 'User not found'}), 404
 
     user.is_approved = True
     db.session.commit()
+    session_claims.bump_auth_version()
+    events.publish('participants_changed')
     return jsonify({'message': 'User approved'})
 
 
-@app.route('/reset_password_request', methods=['GET'])
+@bp.route('/reset_password_request', methods=['GET'])
 def reset_password_request_page():
     """Show password reset request page."""
     return render_template('reset_password_request.html')
 
 
-@app.route('/api/reset_password_request', methods=['POST'])
+@bp.route('/api/reset_password_request', methods=['POST'])
 def reset_password_request_api():
     """Initiate password reset for a user. This endpoint is public but requires admin approval."""
     data = request.get_json()
@@ -986,6 +1225,7 @@ def reset_password_request_api():
     if not username:
         return jsonify({'error': 'Username is required'}), 400
 
+    engine_config.begin_write()
     user = User.query.filter_by(username=username).first()
     if not user:
         return jsonify({'error': 'User not found'}), 404
@@ -1004,16 +1244,22 @@ def reset_password_request_api():
     })
 
 
-@app.route('/api/users/<int:user_id>/admin_reset_password', methods=['POST'])
+@bp.route('/api/users/<int:user_id>/admin_reset_password', methods=['POST'])
 @admin_required
 def admin_reset_password(user_id):
     """Admin-initiated password reset. Generates a new password immediately."""
+    if not User.query.get(user_id):
+        return jsonify({'error': 'User not found'}), 404
+
+    # 遅いハッシュ計算は書き込みロックを取る前に済ませる
+    new_password = User.random_password()
+    password_hash = passwords.hash_password(new_password)
+    engine_config.begin_write()
     user = User.query.get(user_id)
     if not user:
         return jsonify({'error': 'User not found'}), 404
 
-    new_password = user.generate_reset_password()
-    user.set_password(new_password)
+    user.password_hash = password_hash
     user.reset_password = None
     user.reset_password_expires = None
     db.session.commit()
@@ -1024,7 +1270,7 @@ def admin_reset_password(user_id):
     })
 
 
-@app.route('/api/users/<int:user_id>/reset_password', methods=['POST'])
+@bp.route('/api/users/<int:user_id>/reset_password', methods=['POST'])
 def reset_password(user_id):
     """Reset password for a user."""
     # Check if reset password is in session (either admin or the user themselves)
@@ -1033,12 +1279,15 @@ def reset_password(user_id):
     if not reset_password:
         return jsonify({'error': 'No reset password found. Please request reset first.'}), 400
 
+    # 遅いハッシュ計算は書き込みロックを取る前に済ませる
+    password_hash = passwords.hash_password(reset_password)
+    engine_config.begin_write()
     user = User.query.get(user_id)
     if not user:
         return jsonify({'error': 'User not found'}), 404
 
     # Set the new password for the user
-    user.set_password(reset_password)
+    user.password_hash = password_hash
     # Clear the reset password fields
     user.reset_password = None
     user.reset_password_expires = None
@@ -1053,5 +1302,39 @@ def reset_password(user_id):
     })
 
 
+@bp.cli.command('init-db')
+def init_db_command():
+    """Create tables, apply migrations and seed the default users."""
+    init_db(current_app)
+    print('Database initialized')
+
+
+@bp.cli.command('import-participants')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--workers', type=int, default=None, help='Password hashing processes (default: CPU count).')
+def import_participants_command(path, workers):
+    """Bulk-import participants from a CSV or JSON roster file."""
+    fmt = 'json' if path.lower().endswith('.json') else 'csv'
+    with open(path, encoding='utf-8-sig') as f:
+        entries = roster.parse_roster(f.read(), fmt)
+    report = roster.import_participants(entries, workers)
+    print(f"Created {len(report['created'])} participants")
+    for duplicate in report['duplicates']:
+        print(f"Skipped {duplicate['name']}: {duplicate['reason']}")
+    for entry in report['invalid']:
+        print(f"Skipped entry {entry['index']}: {entry['reason']}")
+
+
+@bp.cli.command('reconcile-standings')
+def reconcile_standings_command():
+    """Rebuild participant win/loss/draw/points counters from match_results."""
+    swiss.reconcile_standings()
+    print('Standings counters rebuilt from match_results')
+
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', debug=True)
+    app = create_app()
+    init_db(app)
+    # デバッガは FLASK_DEBUG=1 のときのみ有効（会場ネットワークに公開しない）
+    # 本番は gunicorn -c gunicorn.conf.py wsgi:application で起動する
+    app.run(host='0.0.0.0', debug=os.environ.get('FLASK_DEBUG') == '1', threaded=True)
@@ -0,0 +1,171 @@
+"""Benchmark Swiss pairing against synthetic tournaments.
+
+Seeds approved players into a temporary SQLite database, then plays each
+round: times get_standings, generate_swiss_matches and save_matches_to_db,
+counts the SQL statements each one runs and the rematches the pairing
+produced, and records random results before the next round. Prints a JSON
+report (or writes it with --output).
+
+    python bench_pairing.py
+    python bench_pairing.py --players 256 --rounds 8 --output bench.json
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from sqlalchemy import event, insert
+
+from app import create_app, init_db
+from models import db, Participant, User
+import swiss
+
+DEFAULT_PLAYERS = '16,64,256,1024'
+DEFAULT_ROUNDS = 12
+
+
+class StatementCounter:
+    """Count SQL statements executed on an engine."""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def measure(counter, func, *args, **kwargs):
+    """Call func and return (result, {"seconds", "statements"})."""
+    before = counter.count
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, {
+        'seconds': round(time.perf_counter() - started, 6),
+        'statements': counter.count - before
+    }
+
+
+def seed_players(num_players):
+    """Insert num_players participants, each linked to an approved user."""
+    participant_ids = db.session.scalars(
+        insert(Participant).returning(Participant.id),
+        [{'name': f'player{i}'} for i in range(num_players)]
+    ).all()
+    # ログインしないのでパスワードハッシュは計算しない
+    db.session.execute(insert(User), [
+        {'username': f'player{i}', 'password_hash': '!', 'is_admin': False,
+         'is_approved': True, 'participant_id': pid}
+        for i, pid in enumerate(participant_ids)
+    ])
+    db.session.commit()
+
+
+def count_rematches(matches, opponent_index):
+    """Count player pairs seated together that have already met."""
+    rematches = 0
+    for match in matches:
+        ids = [pid for pid in match['player_ids'] if pid > 0]
+        for i, a in enumerate(ids):
+            rematches += sum(1 for b in ids[i + 1:] if b in opponent_index.get(a, ()))
+    return rematches
+
+
+def random_results(matches):
+    """One random winner per table (3 points), everyone else loses."""
+    entries = []
+    for match in matches:
+        ids = [pid for pid in match['player_ids'] if pid > 0]
+        winner = random.choice(ids)
+        entries.append({'match_id': match['id'], 'results': [
+            {'player_id': pid, 'win': int(pid == winner), 'loss': int(pid != winner),
+             'draw': 0, 'points': 3 if pid == winner else 0}
+            for pid in ids
+        ]})
+    return entries
+
+
+def run_tournament(num_players, num_rounds, time_budget):
+    """Play num_rounds rounds with num_players and return per-round measurements."""
+    with tempfile.TemporaryDirectory() as instance_path:
+        app = create_app({'INSTANCE_PATH': instance_path})
+        init_db(app)
+
+        with app.app_context():
+            seed_players(num_players)
+            counter = StatementCounter(db.engine)
+
+            rounds = []
+            for round_number in range(1, num_rounds + 1):
+                _, standings = measure(counter, swiss.get_standings)
+
+                opponent_index = swiss.build_opponent_index(round_number)
+                matches, pairing = measure(counter, swiss.generate_swiss_matches, round_number,
+                                           time_budget=time_budget)
+
+                round_obj = swiss.create_round(round_number, commit=False)
+                _, save = measure(counter, swiss.save_matches_to_db, matches, round_obj.id)
+
+                _, ok = swiss.record_results_batch(random_results(matches))
+                if not ok:
+                    raise RuntimeError(f'recording results failed in round {round_number}')
+
+                rounds.append({
+                    'round': round_number,
+                    'tables': len(matches),
+                    'rematches': count_rematches(matches, opponent_index),
+                    'get_standings': standings,
+                    'generate_swiss_matches': pairing,
+                    'save_matches_to_db': save
+                })
+
+            db.session.remove()
+            db.engine.dispose()
+        return rounds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', default=DEFAULT_PLAYERS,
+                        help=f'comma-separated player counts (default {DEFAULT_PLAYERS})')
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS,
+                        help=f'rounds to play per tournament (default {DEFAULT_ROUNDS})')
+    parser.add_argument('--seed', type=int, default=0, help='random seed (default 0)')
+    parser.add_argument('--time-budget', type=float, default=swiss.PAIRING_TIME_BUDGET,
+                        help='seconds pairing may spend reducing rematches')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    report = {
+        'python': sys.version.split()[0],
+        'sqlite': sqlite3.sqlite_version,
+        'seed': args.seed,
+        'time_budget': args.time_budget,
+        'tournaments': []
+    }
+    for num_players in [int(n) for n in args.players.split(',')]:
+        started = time.perf_counter()
+        rounds = run_tournament(num_players, args.rounds, args.time_budget)
+        report['tournaments'].append({
+            'players': num_players,
+            'rounds': rounds,
+            'total_rematches': sum(r['rematches'] for r in rounds),
+            'seconds': round(time.perf_counter() - started, 3)
+        })
+        print(f'{num_players} players: {report["tournaments"][-1]["seconds"]}s', file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Versioned response cache for the read-heavy tournament endpoints.
+
+Every write path calls bump_data_version() after it commits. Cached
+responses are tagged with the data version they were built at and are
+reused, or answered with 304 Not Modified, until the version moves.
+
+The version lives in a file under the instance folder rather than in
+process memory, so all worker processes serving the same database agree
+on it: each bump appends one byte and the version is the file size, which
+os.stat reads without touching the database.
+"""
+
+import os
+import threading
+from flask import current_app, request
+
+_version_path = None
+
+# Used instead of the file until init_app() is called (e.g. swiss.py on its own)
+_memory_version = 0
+
+# key -> (data_version, JSON body bytes); only the newest version is kept per key
+_responses = {}
+_lock = threading.Lock()
+
+
+def init_app(app):
+    """Point the data version at the app's instance folder."""
+    global _version_path
+    os.makedirs(app.instance_path, exist_ok=True)
+    _version_path = os.path.join(app.instance_path, 'data_version')
+    if not os.path.exists(_version_path):
+        open(_version_path, 'ab').close()
+
+
+def get_data_version():
+    """Return the current tournament data version."""
+    if _version_path is None:
+        return _memory_version
+    try:
+        return os.stat(_version_path).st_size
+    except OSError:
+        return 0
+
+
+def bump_data_version():
+    """Mark tournament data as changed. Call after the write has committed."""
+    global _memory_version
+    if _version_path is None:
+        _memory_version += 1
+        return
+    fd = os.open(_version_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, b'.')
+    finally:
+        os.close(fd)
+
+
+def cached_json(key, build):
+    """Serve the JSON response for ``key`` from the cache or by calling ``build``.
+
+    ``build`` returns a normal view return value; only 200 responses are
+    cached. Responses carry an ETag of the data version, and a request
+    whose If-None-Match matches it gets 304 without building anything.
+    """
+    version = get_data_version()
+    etag = str(version)
+
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        with _lock:
+            entry = _responses.get(key)
+        if entry is not None and entry[0] == version:
+            response = current_app.response_class(entry[1], mimetype='application/json')
+        else:
+            response = current_app.make_response(build())
+            if response.status_code != 200:
+                return response
+            with _lock:
+                _responses[key] = (version, response.get_data())
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
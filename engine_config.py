@@ -0,0 +1,83 @@
+"""SQLite engine tuning for concurrent result submission.
+
+Applied through SQLAlchemy connection events so every pooled connection
+gets the same settings:
+
+- WAL journaling, so readers never block on the writer and vice versa
+- synchronous=NORMAL, which is durable enough under WAL and avoids an
+  fsync per commit
+- busy_timeout, so a writer waits for the lock instead of failing with
+  "database is locked"
+- BEGIN IMMEDIATE for write transactions started with begin_write(), so
+  concurrent writers queue on the lock up front instead of failing when
+  they upgrade from a read snapshot (SQLite ignores SELECT ... FOR UPDATE)
+"""
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from models import db
+
+# Execution option that makes the next BEGIN on a connection IMMEDIATE
+_IMMEDIATE = 'sqlite_begin_immediate'
+
+_settings = {
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+}
+
+
+def init_app(app):
+    """Configure the SQLite engine. Call before db.init_app(app)."""
+    app.config.setdefault('SQLITE_BUSY_TIMEOUT_MS', 5000)
+    app.config.setdefault('SQLITE_SYNCHRONOUS', 'NORMAL')
+    _settings['busy_timeout'] = int(app.config['SQLITE_BUSY_TIMEOUT_MS'])
+    _settings['synchronous'] = app.config['SQLITE_SYNCHRONOUS']
+
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite':
+        options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+        # インメモリDBは Flask-SQLAlchemy が StaticPool を使うので、プール設定は
+        # ファイルDBで、呼び出し側がプールを指定していない場合だけ与える
+        in_memory = url.database in (None, '', ':memory:') or url.query.get('mode') == 'memory'
+        if not in_memory and 'poolclass' not in options:
+            options.setdefault('pool_size', 10)
+            options.setdefault('max_overflow', 20)
+        connect_args = options.setdefault('connect_args', {})
+        connect_args.setdefault('check_same_thread', False)
+
+    if not event.contains(Engine, 'connect', _on_connect):
+        event.listen(Engine, 'connect', _on_connect)
+        event.listen(Engine, 'begin', _on_begin)
+
+
+def _on_connect(dbapi_connection, connection_record):
+    if type(dbapi_connection).__module__.split('.')[0] != 'sqlite3':
+        return
+    # Let the begin event issue BEGIN instead of the sqlite3 module
+    dbapi_connection.isolation_level = None
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute(f"PRAGMA synchronous={_settings['synchronous']}")
+    cursor.execute(f"PRAGMA busy_timeout={_settings['busy_timeout']}")
+    cursor.close()
+
+
+def _on_begin(conn):
+    if conn.dialect.name != 'sqlite':
+        return
+    if conn.get_execution_options().get(_IMMEDIATE):
+        conn.exec_driver_sql('BEGIN IMMEDIATE')
+    else:
+        conn.exec_driver_sql('BEGIN')
+
+
+def begin_write():
+    """Start a write transaction on db.session with BEGIN IMMEDIATE.
+
+    Any read transaction the session already has open (for example from
+    loading the current user) is committed first, so the write works on a
+    fresh snapshot. Call before the first query of a write path.
+    """
+    if db.session().in_transaction():
+        db.session.commit()
+    db.session.connection(execution_options={_IMMEDIATE: True})
@@ -0,0 +1,147 @@
+"""Server-Sent Events channel for live tournament updates.
+
+Write paths call publish() after they commit. Each event is appended as
+one JSON line to a log file under the instance folder, so events reach
+clients connected to any worker process. /api/events tails that log and
+uses the byte offset after each line as the SSE event id, which lets
+EventSource resume from Last-Event-ID after a reconnect.
+
+Each open stream holds a request thread, so a worker serves at most
+SSE_MAX_STREAMS of them (by default a quarter of GUNICORN_THREADS); beyond
+that /api/events answers 503 and the client falls back to polling.
+"""
+
+import json
+import os
+import threading
+import time
+from flask import Response, jsonify, request
+import cache
+
+# Seconds between checks of the event log while a stream is idle
+POLL_INTERVAL = 0.5
+# Seconds between keep-alive comments on an idle stream
+KEEPALIVE_INTERVAL = 15
+
+_log_path = None
+
+# Limits concurrent streams in this process; set by init_app()
+_stream_slots = None
+
+
+def init_app(app):
+    """Point the event log at the app's instance folder and cap open streams."""
+    global _log_path, _stream_slots
+    app.config.setdefault('SSE_MAX_STREAMS', max(1, int(os.environ.get('GUNICORN_THREADS', 32)) // 4))
+    _stream_slots = threading.BoundedSemaphore(int(app.config['SSE_MAX_STREAMS']))
+    os.makedirs(app.instance_path, exist_ok=True)
+    _log_path = os.path.join(app.instance_path, 'events.log')
+    if not os.path.exists(_log_path):
+        open(_log_path, 'ab').close()
+
+
+def publish(event_type, **data):
+    """Bump the data version and publish a compact change event.
+
+    The event carries its type, the given fields and the new data version,
+    e.g. {"type": "match_result", "match_id": 17, "version": 92}.
+    """
+    cache.bump_data_version()
+    if _log_path is None:
+        return
+
+    event = {'type': event_type}
+    event.update(data)
+    event['version'] = cache.get_data_version()
+    line = (json.dumps(event, separators=(',', ':')) + '\n').encode()
+
+    # A single O_APPEND write keeps lines from different processes intact
+    fd = os.open(_log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def _resume_offset(path, last_event_id, size):
+    """Byte offset to resume from after Last-Event-ID.
+
+    Event ids are offsets just after a newline. An id that is out of range
+    or does not fall on a line start (for example after the log was
+    recreated) resumes from the end of the log instead.
+    """
+    if last_event_id is None or not 0 <= last_event_id <= size:
+        return size
+    if last_event_id == 0:
+        return 0
+    with open(path, 'rb') as f:
+        f.seek(last_event_id - 1)
+        return last_event_id if f.read(1) == b'\n' else size
+
+
+def stream():
+    """Return a text/event-stream response of events published from now on.
+
+    Resumes after the Last-Event-ID header when the client sends one.
+    Answers 503 when this worker already serves SSE_MAX_STREAMS streams.
+    """
+    slots = _stream_slots
+    if slots is not None and not slots.acquire(blocking=False):
+        response = jsonify({'error': 'Too many event streams. Poll for changes instead.'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '60'
+        return response
+
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    path = _log_path
+
+    def generate():
+        size = os.stat(path).st_size
+        offset = _resume_offset(path, last_event_id, size)
+        idle = 0.0
+
+        yield 'retry: 3000\n\n'
+        while True:
+            size = os.stat(path).st_size
+            if size < offset:
+                # Log was replaced; continue from its current end
+                offset = size
+
+            if size > offset:
+                with open(path, 'rb') as f:
+                    f.seek(offset)
+                    chunk = f.read(size - offset)
+
+                # Only send complete lines; a partial one is picked up next time
+                pos = 0
+                while True:
+                    end = chunk.find(b'\n', pos)
+                    if end < 0:
+                        break
+                    line = chunk[pos:end]
+                    pos = end + 1
+                    try:
+                        line = line.decode()
+                        event_type = json.loads(line)['type']
+                    except (ValueError, KeyError, TypeError):
+                        # 壊れた行（置き換え前のログの途中など）は飛ばし、ストリームは続ける
+                        continue
+                    yield f'id: {offset + pos}\nevent: {event_type}\ndata: {line}\n\n'
+                offset += pos
+                idle = 0.0
+                continue
+
+            time.sleep(POLL_INTERVAL)
+            idle += POLL_INTERVAL
+            if idle >= KEEPALIVE_INTERVAL:
+                idle = 0.0
+                yield ': keep-alive\n\n'
+
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    if slots is not None:
+        # クライアント切断でレスポンスが閉じられたら枠を返す
+        response.call_on_close(slots.release)
+    return response
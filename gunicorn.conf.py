@@ -0,0 +1,45 @@
+"""Gunicorn settings for serving the tournament at the venue.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Worker and thread counts can be overridden with WEB_CONCURRENCY and
+GUNICORN_THREADS. Each open /api/events stream holds one thread, so a
+worker keeps at most a quarter of its threads for streams (SSE_MAX_STREAMS);
+clients over that limit poll for changes instead.
+"""
+
+import multiprocessing
+import os
+import time
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+accesslog = '-'
+
+# Seconds a worker may take from fork to ready before a warning is logged
+worker_boot_budget = float(os.environ.get('WORKER_BOOT_BUDGET', 1.0))
+
+
+def on_starting(server):
+    """Create tables, migrate and seed users once, before any worker starts."""
+    from app import create_app, init_db
+    init_db(create_app())
+
+
+def post_fork(server, worker):
+    worker.boot_started = time.perf_counter()
+
+
+def post_worker_init(worker):
+    """Log how long the worker took to import and build the app."""
+    elapsed = time.perf_counter() - worker.boot_started
+    if elapsed > worker_boot_budget:
+        worker.log.warning('Worker %s booted in %.3fs (budget %.3fs)',
+                           worker.pid, elapsed, worker_boot_budget)
+    else:
+        worker.log.info('Worker %s booted in %.3fs', worker.pid, elapsed)
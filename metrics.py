@@ -0,0 +1,119 @@
+"""Per-request SQL and latency instrumentation.
+
+Counts the SQL statements each request runs and the time spent in them
+(via cursor execute events), and the total handler time. Every response
+gets a Server-Timing header, e.g.
+
+    Server-Timing: db;dur=3.1;desc="4 queries", app;dur=12.7
+
+and the most recent samples per endpoint are kept for summary(), which
+/api/admin/metrics serves with p50/p95. Samples live in process memory,
+so under gunicorn each worker reports its own traffic.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# (method, endpoint) -> deque of (total_ms, sql_ms, queries)
+_samples = defaultdict(deque)
+_lock = threading.Lock()
+_sample_size = 1000
+
+
+def init_app(app):
+    """Register the request hooks and SQL cursor listeners."""
+    global _sample_size
+    app.config.setdefault('METRICS_SAMPLE_SIZE', 1000)
+    _sample_size = int(app.config['METRICS_SAMPLE_SIZE'])
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # 開始時刻は文ごとの実行コンテキストに持たせる。失敗した文は after が呼ばれないが、
+    # コンテキストごと捨てられるので接続側に残らない
+    if context is not None:
+        context.metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, 'metrics_started', None)
+    if started is None:
+        return
+    if has_request_context() and 'metrics_started' in g:
+        g.metrics_queries += 1
+        g.metrics_sql_time += time.perf_counter() - started
+
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_queries = 0
+    g.metrics_sql_time = 0.0
+
+
+def _finish_request(response):
+    if 'metrics_started' not in g:
+        return response
+    total_ms = (time.perf_counter() - g.metrics_started) * 1000
+    sql_ms = g.metrics_sql_time * 1000
+    queries = g.metrics_queries
+
+    response.headers.add(
+        'Server-Timing',
+        f'db;dur={sql_ms:.1f};desc="{queries} queries", app;dur={total_ms:.1f}'
+    )
+
+    key = (request.method, request.endpoint or 'unmatched')
+    with _lock:
+        samples = _samples[key]
+        samples.append((total_ms, sql_ms, queries))
+        if len(samples) > _sample_size:
+            samples.popleft()
+    return response
+
+
+def _percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def summary():
+    """Return p50/p95 latency, SQL time and query counts per endpoint."""
+    with _lock:
+        snapshot = {key: list(samples) for key, samples in _samples.items()}
+
+    endpoints = []
+    for (method, endpoint), samples in sorted(snapshot.items(), key=lambda item: item[0][1]):
+        total = sorted(s[0] for s in samples)
+        sql = sorted(s[1] for s in samples)
+        queries = sorted(s[2] for s in samples)
+        endpoints.append({
+            'method': method,
+            'endpoint': endpoint,
+            'count': len(samples),
+            'total_ms': {'p50': round(_percentile(total, 0.5), 2),
+                         'p95': round(_percentile(total, 0.95), 2)},
+            'sql_ms': {'p50': round(_percentile(sql, 0.5), 2),
+                       'p95': round(_percentile(sql, 0.95), 2)},
+            'queries': {'p50': _percentile(queries, 0.5),
+                        'p95': _percentile(queries, 0.95),
+                        'max': queries[-1]}
+        })
+    return {'pid': os.getpid(), 'sample_size': _sample_size, 'endpoints': endpoints}
+
+
+def reset():
+    """Drop all collected samples."""
+    with _lock:
+        _samples.clear()
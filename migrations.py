@@ -0,0 +1,185 @@
+"""Versioned schema migrations for the tournament database.
+
+db.create_all() only creates missing tables, so changes to existing tables
+(new columns, indexes, backfills) are applied here. Each migration runs
+once, in order, and the highest applied version is recorded in the
+schema_version table.
+"""
+
+from flask import current_app
+from models import db
+
+
+def _column_exists(table, column):
+    rows = db.session.execute(db.text(f'PRAGMA table_info({table})')).fetchall()
+    return any(row[1] == column for row in rows)
+
+
+def _index_exists(name):
+    return db.session.execute(
+        db.text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"),
+        {'name': name}
+    ).first() is not None
+
+
+def add_round_is_frozen():
+    """Add rounds.is_frozen to databases created before round freezing."""
+    if not _column_exists('rounds', 'is_frozen'):
+        db.session.execute(db.text(
+            'ALTER TABLE rounds ADD COLUMN is_frozen BOOLEAN NOT NULL DEFAULT 0'
+        ))
+
+
+def add_match_result_unique_index():
+    """Enforce one result per player per match on older databases.
+
+    Existing duplicate results make the index creation fail. That is logged
+    as an error rather than aborting start-up, and upgrade() retries on
+    every start until the duplicates are cleaned up.
+    """
+    from sqlalchemy.exc import IntegrityError
+
+    if _index_exists('uq_match_result_match_player'):
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(db.text(
+                'CREATE UNIQUE INDEX uq_match_result_match_player '
+                'ON match_results (match_id, player_id)'
+            ))
+    except IntegrityError:
+        duplicates = db.session.execute(db.text(
+            'SELECT COUNT(*) FROM (SELECT 1 FROM match_results '
+            'GROUP BY match_id, player_id HAVING COUNT(*) > 1)'
+        )).scalar()
+        current_app.logger.error(
+            'uq_match_result_match_player not created: %d (match_id, player_id) pairs '
+            'have duplicate results in match_results. Remove the duplicates and '
+            'restart to create it.', duplicates
+        )
+
+
+def add_hot_column_indexes():
+    """Index the columns used by per-player, per-round and per-user lookups."""
+    statements = [
+        'CREATE INDEX IF NOT EXISTS ix_matches_player1_id ON matches (player1_id)',
+        'CREATE INDEX IF NOT EXISTS ix_matches_player2_id ON matches (player2_id)',
+        'CREATE INDEX IF NOT EXISTS ix_matches_player3_id ON matches (player3_id)',
+        'CREATE INDEX IF NOT EXISTS ix_matches_player4_id ON matches (player4_id)',
+        'CREATE INDEX IF NOT EXISTS ix_matches_round_table ON matches (round_id, table_number)',
+        'CREATE INDEX IF NOT EXISTS ix_match_results_player_id ON match_results (player_id)',
+        'CREATE INDEX IF NOT EXISTS ix_users_participant_id ON users (participant_id)',
+    ]
+    for statement in statements:
+        db.session.execute(db.text(statement))
+
+
+def backfill_standings_counters():
+    """Fill the Participant standings counters from existing match_results."""
+    import swiss
+    swiss.reconcile_standings()
+
+
+def backfill_match_seats():
+    """Fill match_seats from the player1_id..player4_id columns of existing matches."""
+    for seat in range(1, 5):
+        db.session.execute(db.text(
+            f'INSERT OR IGNORE INTO match_seats (match_id, seat, participant_id) '
+            f'SELECT id, {seat}, player{seat}_id FROM matches '
+            f'WHERE player{seat}_id IS NOT NULL'
+        ))
+
+
+def add_match_completed():
+    """Add matches.completed/completed_at and convert result_json to JSON.
+
+    Older rows stored str(results), a Python repr; they are parsed with
+    ast.literal_eval and rewritten with json.dumps.
+    """
+    import ast
+    import json
+
+    if not _column_exists('matches', 'completed'):
+        db.session.execute(db.text(
+            'ALTER TABLE matches ADD COLUMN completed BOOLEAN NOT NULL DEFAULT 0'
+        ))
+    if not _column_exists('matches', 'completed_at'):
+        db.session.execute(db.text('ALTER TABLE matches ADD COLUMN completed_at DATETIME'))
+    db.session.execute(db.text(
+        'UPDATE matches SET completed = 1 WHERE result_json IS NOT NULL'
+    ))
+    db.session.execute(db.text(
+        'CREATE INDEX IF NOT EXISTS ix_matches_round_completed ON matches (round_id, completed)'
+    ))
+
+    rows = db.session.execute(db.text(
+        'SELECT id, result_json FROM matches WHERE result_json IS NOT NULL'
+    )).fetchall()
+    for match_id, result_json in rows:
+        try:
+            json.loads(result_json)
+            continue
+        except ValueError:
+            pass
+        try:
+            results = ast.literal_eval(result_json)
+        except (ValueError, SyntaxError):
+            results = None
+        db.session.execute(
+            db.text('UPDATE matches SET result_json = :result_json WHERE id = :id'),
+            {'result_json': json.dumps(results), 'id': match_id}
+        )
+
+
+# (version, migration) in the order they must be applied. Never renumber or
+# remove an entry; append new migrations with the next version.
+MIGRATIONS = [
+    (1, add_round_is_frozen),
+    (2, add_match_result_unique_index),
+    (3, add_hot_column_indexes),
+    (4, backfill_standings_counters),
+    (5, backfill_match_seats),
+    (6, add_match_completed),
+]
+
+
+def get_schema_version():
+    """Return the highest applied migration version (0 for a fresh database)."""
+    db.session.execute(db.text(
+        'CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)'
+    ))
+    version = db.session.execute(db.text('SELECT MAX(version) FROM schema_version')).scalar()
+    return version or 0
+
+
+def upgrade():
+    """Apply every pending migration, committing and recording each in turn.
+
+    Must run inside an application context, after db.create_all().
+    Returns the list of versions that were applied.
+    """
+    current = get_schema_version()
+    db.session.commit()
+
+    applied = []
+    for version, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            migration()
+            db.session.execute(
+                db.text('INSERT INTO schema_version (version) VALUES (:version)'),
+                {'version': version}
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        applied.append(version)
+
+    # 既存の重複で作れなかった一意インデックスは、作れるまで起動のたびに再試行する
+    if 2 not in applied:
+        add_match_result_unique_index()
+        db.session.commit()
+
+    return applied
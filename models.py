@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 import datetime
+import json
 
 db = SQLAlchemy()
 
@@ -13,7 +14,7 @@ class User(db.Model):
     password_hash = db.Column(db.String(128), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)
     is_approved = db.Column(db.Boolean, default=False)  # Admin approval required for login
-    participant_id = db.Column(db.Integer, db.ForeignKey('participants.id'), nullable=True)
+    participant_id = db.Column(db.Integer, db.ForeignKey('participants.id'), nullable=True, index=True)
 
     # Password reset fields
     reset_password = db.Column(db.String(6), nullable=True)
@@ -35,12 +36,17 @@ class User(db.Model):
             'participant_id': self.participant_id
         }
 
-    def generate_reset_password(self):
-        """Generate a random 6-character reset password."""
+    @staticmethod
+    def random_password():
+        """Return a random 6-character password."""
         import random
         import string
         characters = string.ascii_letters + string.digits
-        self.reset_password = ''.join(random.choices(characters, k=6))
+        return ''.join(random.choices(characters, k=6))
+
+    def generate_reset_password(self):
+        """Generate a random 6-character reset password."""
+        self.reset_password = User.random_password()
         self.reset_password_expires = datetime.datetime.now() + datetime.timedelta(hours=24)
         return self.reset_password
 
@@ -77,15 +83,21 @@ class Round(db.Model):
 
 class Match(db.Model):
     __tablename__ = 'matches'
+    __table_args__ = (
+        db.Index('ix_matches_round_table', 'round_id', 'table_number'),
+        db.Index('ix_matches_round_completed', 'round_id', 'completed'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     round_id = db.Column(db.Integer, db.ForeignKey('rounds.id'), nullable=False)
     table_number = db.Column(db.Integer, nullable=False)
-    player1_id = db.Column(db.Integer, db.ForeignKey('participants.id'))
-    player2_id = db.Column(db.Integer, db.ForeignKey('participants.id'))
-    player3_id = db.Column(db.Integer, db.ForeignKey('participants.id'))
-    player4_id = db.Column(db.Integer, db.ForeignKey('participants.id'))
-    result_json = db.Column(db.Text)
+    player1_id = db.Column(db.Integer, db.ForeignKey('participants.id'), index=True)
+    player2_id = db.Column(db.Integer, db.ForeignKey('participants.id'), index=True)
+    player3_id = db.Column(db.Integer, db.ForeignKey('participants.id'), index=True)
+    player4_id = db.Column(db.Integer, db.ForeignKey('participants.id'), index=True)
+    result_json = db.Column(db.Text)  # submitted results as a JSON array
+    completed = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    completed_at = db.Column(db.DateTime)
 
     round = db.relationship('Round', backref=db.backref('matches', lazy=True))
     player1 = db.relationship('Participant', foreign_keys=[player1_id])
@@ -93,6 +105,16 @@ class Match(db.Model):
     player3 = db.relationship('Participant', foreign_keys=[player3_id])
     player4 = db.relationship('Participant', foreign_keys=[player4_id])
 
+    def set_results(self, results):
+        """Store the submitted results as JSON and mark the match completed."""
+        self.result_json = json.dumps(results)
+        self.completed = True
+        self.completed_at = datetime.datetime.now()
+
+    def get_results(self):
+        """Return the stored results list, or None if none are recorded."""
+        return json.loads(self.result_json) if self.result_json else None
+
 
 class MatchResult(db.Model):
     __tablename__ = 'match_results'
@@ -102,7 +124,7 @@ class MatchResult(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     match_id = db.Column(db.Integer, db.ForeignKey('matches.id'), nullable=False)
-    player_id = db.Column(db.Integer, db.ForeignKey('participants.id'), nullable=False)
+    player_id = db.Column(db.Integer, db.ForeignKey('participants.id'), nullable=False, index=True)
     win = db.Column(db.Integer, default=0)
     loss = db.Column(db.Integer, default=0)
     draw = db.Column(db.Integer, default=0)
@@ -110,3 +132,18 @@ class MatchResult(db.Model):
 
     match = db.relationship('Match', backref=db.backref('results', lazy=True))
     player = db.relationship('Participant', foreign_keys=[player_id])
+
+
+class MatchSeat(db.Model):
+    """One row per occupied seat, so per-player lookups can use an index.
+
+    Written alongside Match.player1_id..player4_id (seat 1..4) whenever a
+    table is created or its seating changes.
+    """
+    __tablename__ = 'match_seats'
+
+    match_id = db.Column(db.Integer, db.ForeignKey('matches.id'), primary_key=True)
+    seat = db.Column(db.Integer, primary_key=True)
+    participant_id = db.Column(db.Integer, db.ForeignKey('participants.id'), nullable=False, index=True)
+
+    match = db.relationship('Match', backref=db.backref('seats', lazy=True, cascade='all, delete-orphan'))
@@ -0,0 +1,157 @@
+"""Password hashing off the request threads, with login throttling.
+
+pbkdf2 hashing is deliberately slow. Run on the request threads, a burst
+of logins at doors-open occupies every worker thread and starves cheap
+requests such as standings polls. Here hashing and verification run on a
+small bounded thread pool (hashlib releases the GIL while hashing). At
+most PASSWORD_HASH_WORKERS hashes run at once, and at most
+PASSWORD_HASH_QUEUE more wait; beyond that PasswordPoolBusy is raised, so
+the caller can answer 503 instead of queueing without limit. The default
+queue admits a quarter of the worker's request threads (GUNICORN_THREADS)
+in total, leaving the rest free for everything that is not a login.
+
+Failed logins are counted per username. After LOGIN_MAX_FAILURES failures
+within LOGIN_FAILURE_WINDOW seconds, further attempts are refused until the
+window passes, without spending a hash on them.
+
+PASSWORD_HASH_METHOD sets the werkzeug hash method and cost (e.g.
+"pbkdf2:sha256:600000"). Hashes made with a different method are
+transparently replaced on the next successful login (see needs_rehash).
+
+Pool and throttle state live in process memory, per worker process.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when the hashing queue is full."""
+
+
+_settings = {
+    'method': 'pbkdf2:sha256',
+    'workers': 2,
+    'queue': 6,
+    'max_failures': 5,
+    'failure_window': 60,
+}
+
+_pool = None
+_slots = None
+_pool_lock = threading.Lock()
+
+# hash method -> stored method prefix, e.g. "pbkdf2:sha256" -> "pbkdf2:sha256:600000"
+_method_prefixes = {}
+
+# username -> (failure count, time of first failure in the window)
+_failures = {}
+_failures_lock = threading.Lock()
+
+
+def init_app(app):
+    """Read the hashing and throttling settings from the app config."""
+    global _pool, _slots
+    app.config.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+    app.config.setdefault('PASSWORD_HASH_WORKERS', 2)
+    # 待ち行列はリクエストスレッド数より十分小さくし、ログイン以外の要求用にスレッドを残す
+    request_threads = int(os.environ.get('GUNICORN_THREADS', 32))
+    app.config.setdefault('PASSWORD_HASH_QUEUE', max(1, request_threads // 4 - 2))
+    app.config.setdefault('LOGIN_MAX_FAILURES', 5)
+    app.config.setdefault('LOGIN_FAILURE_WINDOW', 60)
+    _settings['method'] = app.config['PASSWORD_HASH_METHOD']
+    _settings['workers'] = int(app.config['PASSWORD_HASH_WORKERS'])
+    _settings['queue'] = int(app.config['PASSWORD_HASH_QUEUE'])
+    _settings['max_failures'] = int(app.config['LOGIN_MAX_FAILURES'])
+    _settings['failure_window'] = float(app.config['LOGIN_FAILURE_WINDOW'])
+    # Created on first use, so no threads exist before gunicorn forks workers
+    _pool = None
+    _slots = None
+
+
+def get_method():
+    """Return the configured werkzeug hash method."""
+    return _settings['method']
+
+
+def _submit(func, *args):
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=_settings['workers'],
+                                       thread_name_prefix='password-hash')
+            _slots = threading.BoundedSemaphore(_settings['workers'] + _settings['queue'])
+        pool, slots = _pool, _slots
+
+    if not slots.acquire(blocking=False):
+        raise PasswordPoolBusy()
+    try:
+        future = pool.submit(func, *args)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future.result()
+
+
+def hash_password(password):
+    """Hash a password with the configured method on the hashing pool."""
+    return _submit(generate_password_hash, password, _settings['method'])
+
+
+def verify_password(password_hash, password):
+    """Check a password against its hash on the hashing pool."""
+    return _submit(check_password_hash, password_hash, password)
+
+
+def _method_prefix(method):
+    # werkzeug は既定値を展開して保存する（"scrypt" -> "scrypt:32768:8:1" など）ので、
+    # 設定した方式で一度ハッシュを作り、その保存形式の接頭辞と比較する
+    with _pool_lock:
+        prefix = _method_prefixes.get(method)
+    if prefix is None:
+        prefix = generate_password_hash('', method).split('$', 1)[0]
+        with _pool_lock:
+            _method_prefixes[method] = prefix
+    return prefix
+
+
+def needs_rehash(password_hash):
+    """True if the hash was made with a method other than the configured one."""
+    return password_hash.split('$', 1)[0] != _method_prefix(_settings['method'])
+
+
+def throttle_delay(username):
+    """Seconds the username must wait before another attempt (0 if allowed)."""
+    with _failures_lock:
+        entry = _failures.get(username)
+        if entry is None:
+            return 0
+        count, started = entry
+        remaining = _settings['failure_window'] - (time.monotonic() - started)
+        if remaining <= 0:
+            del _failures[username]
+            return 0
+        return remaining if count >= _settings['max_failures'] else 0
+
+
+def record_failure(username):
+    """Count a failed login attempt for the username."""
+    now = time.monotonic()
+    window = _settings['failure_window']
+    with _failures_lock:
+        # 窓を過ぎた他のユーザー名も捨て、ランダムな名前の総当たりで肥大化しないようにする
+        expired = [name for name, (_, started) in _failures.items() if now - started >= window]
+        for name in expired:
+            del _failures[name]
+        count, started = _failures.get(username, (0, now))
+        _failures[username] = (count + 1, started)
+
+
+def clear_failures(username):
+    """Forget failed attempts after a successful login."""
+    with _failures_lock:
+        _failures.pop(username, None)
@@ -0,0 +1,166 @@
+"""Bulk participant import from CSV or JSON rosters.
+
+Each roster entry becomes a Participant plus an approved User with the
+same name, exactly as POST /api/participants creates one at a time. The
+default passwords are hashed across a process pool, and all rows are
+inserted in one transaction. Names that already exist, or that repeat
+within the roster, are reported as duplicates and skipped.
+"""
+
+import csv
+import io
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+from models import db, Participant, User
+import engine_config
+import events
+import passwords as password_hashing
+
+# Below this many passwords the pool start-up costs more than it saves
+MIN_PARALLEL_HASHES = 4
+
+
+def default_password(name):
+    """Default password for an imported or admin-added participant."""
+    return name.lower().replace(' ', '') + '123'
+
+
+def _hash_password(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def parse_roster(text, fmt):
+    """Parse a roster into a list of {"name", "password"?} entries.
+
+    ``fmt`` is "csv" or "json". CSV rosters use a "name" column (and an
+    optional "password" column) when there is a header row, otherwise the
+    first column. JSON rosters are a list of names or of objects with
+    "name"/"password", or an object with such a list under "participants".
+    Raises ValueError for malformed input.
+    """
+    if fmt == 'json':
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = data.get('participants')
+        if not isinstance(data, list):
+            raise ValueError('JSON roster must be a list of participants')
+        entries = []
+        for item in data:
+            if isinstance(item, str):
+                entries.append({'name': item})
+            elif isinstance(item, dict) and isinstance(item.get('name'), str):
+                if item.get('password') is not None and not isinstance(item['password'], str):
+                    raise ValueError('Password must be a string')
+                entries.append({k: item[k] for k in ('name', 'password') if item.get(k)})
+            else:
+                raise ValueError('Each participant must be a name or an object with a name')
+        return entries
+
+    if fmt == 'csv':
+        rows = [row for row in csv.reader(io.StringIO(text)) if any(cell.strip() for cell in row)]
+        if not rows:
+            return []
+        header = [cell.strip().lower() for cell in rows[0]]
+        if 'name' in header:
+            name_col = header.index('name')
+            password_col = header.index('password') if 'password' in header else None
+            rows = rows[1:]
+        else:
+            name_col, password_col = 0, None
+        entries = []
+        for row in rows:
+            entry = {'name': row[name_col] if name_col < len(row) else ''}
+            if password_col is not None and password_col < len(row) and row[password_col].strip():
+                entry['password'] = row[password_col].strip()
+            entries.append(entry)
+        return entries
+
+    raise ValueError(f'Unsupported roster format: {fmt}')
+
+
+def hash_passwords(passwords, workers=None, method=None):
+    """Hash passwords in parallel, returning the hashes in the same order.
+
+    ``method`` defaults to the configured PASSWORD_HASH_METHOD.
+    """
+    workers = workers or os.cpu_count() or 1
+    method = method or password_hashing.get_method()
+    if workers < 2 or len(passwords) < MIN_PARALLEL_HASHES:
+        return [_hash_password(p, method) for p in passwords]
+    # スレッドを持つWSGIワーカーからforkするとロックを抱えたまま複製されうるため spawn を使う
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(workers, len(passwords)), mp_context=context) as pool:
+        return list(pool.map(_hash_password, passwords, [method] * len(passwords), chunksize=8))
+
+
+def _existing_usernames(names):
+    existing = set()
+    for start in range(0, len(names), 500):
+        existing.update(db.session.scalars(
+            db.select(User.username).where(User.username.in_(names[start:start + 500]))
+        ))
+    return existing
+
+
+def import_participants(entries, workers=None):
+    """Create participants and approved users for the roster entries.
+
+    Returns {"created": [{"id", "name"}], "duplicates": [{"name", "reason"}],
+    "invalid": [{"index", "reason"}]}. Everything is written in one commit.
+    """
+    created, duplicates, invalid = [], [], []
+    seen = set()
+    candidates = []
+    for index, entry in enumerate(entries):
+        name = (entry.get('name') or '').strip()
+        if not name:
+            invalid.append({'index': index, 'reason': 'Name is required'})
+        elif len(name) > 80:
+            invalid.append({'index': index, 'reason': 'Name is too long'})
+        elif name in seen:
+            duplicates.append({'name': name, 'reason': 'Repeated in roster'})
+        else:
+            seen.add(name)
+            candidates.append((name, entry.get('password') or default_password(name)))
+
+    # 既存ユーザー名は先に除外し、遅いハッシュ計算は書き込みロックを取る前に済ませる
+    existing = _existing_usernames([name for name, _ in candidates])
+    for name, _ in candidates:
+        if name in existing:
+            duplicates.append({'name': name, 'reason': 'Username already exists'})
+    candidates = [(name, password) for name, password in candidates if name not in existing]
+    hashes = hash_passwords([password for _, password in candidates], workers)
+
+    # ハッシュ計算中に登録された名前もロック取得後に確認する
+    engine_config.begin_write()
+    existing = _existing_usernames([name for name, _ in candidates])
+
+    rows = []
+    for (name, _), password_hash in zip(candidates, hashes):
+        if name in existing:
+            duplicates.append({'name': name, 'reason': 'Username already exists'})
+        else:
+            rows.append((name, password_hash))
+
+    if rows:
+        # RETURNING の行順は保証されないので、この取り込み内で一意な名前で対応付ける
+        ids_by_name = dict(db.session.execute(
+            insert(Participant).returning(Participant.name, Participant.id),
+            [{'name': name} for name, _ in rows]
+        ).all())
+        db.session.execute(insert(User), [
+            {'username': name, 'password_hash': password_hash, 'is_admin': False,
+             'is_approved': True, 'participant_id': ids_by_name[name]}
+            for name, password_hash in rows
+        ])
+        created = [{'id': ids_by_name[name], 'name': name} for name, _ in rows]
+
+    db.session.commit()
+    if created:
+        events.publish('participants_changed')
+
+    return {'created': created, 'duplicates': duplicates, 'invalid': invalid}
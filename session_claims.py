@@ -0,0 +1,80 @@
+"""Signed session claims so read endpoints can authenticate without the database.
+
+With SESSION_CLAIMS enabled, the user's id, is_admin, is_approved and
+participant_id are written into the (signed) session cookie together with
+the current auth version. Any change to roles, approval or accounts calls
+bump_auth_version(), which makes every outstanding claim stale; a stale or
+missing claim falls back to loading the User row and is re-issued.
+
+Like the data version in cache.py, the auth version is the size of an
+append-only file in the instance folder, so all worker processes agree on
+it without a database query.
+"""
+
+import os
+from collections import namedtuple
+
+# Who is logged in, as far as authorization checks need to know
+Identity = namedtuple('Identity', ['id', 'is_admin', 'is_approved', 'participant_id'])
+
+_enabled = False
+_version_path = None
+
+
+def init_app(app):
+    """Read SESSION_CLAIMS and point the auth version at the instance folder."""
+    global _enabled, _version_path
+    app.config.setdefault('SESSION_CLAIMS', False)
+    _enabled = bool(app.config['SESSION_CLAIMS'])
+    os.makedirs(app.instance_path, exist_ok=True)
+    _version_path = os.path.join(app.instance_path, 'auth_version')
+    if not os.path.exists(_version_path):
+        open(_version_path, 'ab').close()
+
+
+def get_auth_version():
+    """Return the current auth version (0 before init_app)."""
+    if _version_path is None:
+        return 0
+    try:
+        return os.stat(_version_path).st_size
+    except FileNotFoundError:
+        return 0
+
+
+def bump_auth_version():
+    """Invalidate every issued claim. Call after committing a user change."""
+    if _version_path is None:
+        return
+    fd = os.open(_version_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, b'.')
+    finally:
+        os.close(fd)
+
+
+def identity_from_user(user):
+    return Identity(user.id, bool(user.is_admin), bool(user.is_approved), user.participant_id)
+
+
+def store(session, user):
+    """Sign the user's claims into the session, stamped with the auth version."""
+    if not _enabled:
+        return
+    session['claims'] = {
+        'is_admin': bool(user.is_admin),
+        'is_approved': bool(user.is_approved),
+        'participant_id': user.participant_id,
+        'v': get_auth_version()
+    }
+
+
+def load(session):
+    """Return the Identity from current session claims, or None if absent or stale."""
+    if not _enabled:
+        return None
+    claims = session.get('claims')
+    user_id = session.get('user_id')
+    if not claims or user_id is None or claims.get('v') != get_auth_version():
+        return None
+    return Identity(user_id, claims['is_admin'], claims['is_approved'], claims['participant_id'])
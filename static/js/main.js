@@ -133,6 +133,9 @@ document.addEventListener('DOMContentLoaded', async () => {
     refreshStandings();
     loadRoundSelect();
 
+    // 以降の変更はサーバーからの通知で反映
+    connectEvents();
+
     // 管理者なら参加者キャッシュを読み込み
     if (currentUser && currentUser.is_admin) {
         loadParticipantsCache();
@@ -185,6 +188,29 @@ document.addEventListener('DOMContentLoaded', async () => {
 // 参加者キャッシュ
 let participantsCache = [];
 
+// ETag 付きレスポンスのキャッシュ（URL → { etag, body }）
+const etagCache = new Map();
+
+// If-None-Match を付けて GET し、304 なら前回のレスポンス本文を再利用する
+async function fetchWithEtag(url) {
+    const cached = etagCache.get(url);
+    const headers = cached ? { 'If-None-Match': cached.etag } : {};
+    const response = await fetch(url, { headers });
+
+    if (response.status === 304 && cached) {
+        return new Response(cached.body, {
+            status: 200,
+            headers: { 'Content-Type': 'application/json', 'ETag': cached.etag }
+        });
+    }
+
+    const etag = response.headers.get('ETag');
+    if (response.ok && etag) {
+        etagCache.set(url, { etag, body: await response.clone().text() });
+    }
+    return response;
+}
+
 // セッションチェック
 async function checkUserSession() {
     try {
@@ -211,7 +237,7 @@ async function checkUserSession() {
 // 全参加者をキャッシュ
 async function loadParticipantsCache() {
     try {
-        const response = await fetch('/api/participants');
+        const response = await fetchWithEtag('/api/participants');
         if (response.ok) {
             participantsCache = await response.json();
         }
@@ -284,7 +310,7 @@ async function deleteParticipant(id) {
 
 async function loadParticipants() {
     try {
-        const response = await fetch('/api/participants');
+        const response = await fetchWithEtag('/api/participants');
         const participants = await response.json();
 
         // 管理者か通常ユーザーかで表示を分ける
@@ -428,7 +454,7 @@ async function viewRoundMatches(roundId) {
             freezeBtn.style.display = 'none';
         }
 
-        const response = await fetch(`/api/matches/round/${roundId}`);
+        const response = await fetchWithEtag(`/api/matches/round/${roundId}`);
         const data = await response.json();
 
         const container = document.getElementById('matches-container');
@@ -465,31 +491,7 @@ async function viewRoundMatches(roundId) {
             const canEditResults = isAdmin && match.result_json === null; // 結果未記録の場合は表示（編集モード用）
             const canEditCompleted = isAdmin; // 結果完了の場合は管理者のみ修正可能
 
-            const resultHtml = match.completed
-                ? (isAdmin
-                    ? `
-                    <button class="btn-edit" onclick="editMatchResults(${match.id})">結果修正</button>
-                    <button class="btn-secondary" onclick="showMatchHistory(${match.id})">結果履歴</button>
-                  `
-                    : `
-                    <span class="btn-secondary disabled-btn">結果記録済み</span>
-                    <button class="btn-secondary" onclick="showMatchHistory(${match.id})">結果履歴</button>
-                  `)
-                : (isAdmin
-                    ? `<button class="btn-secondary" onclick="showMatchResults(${match.id})">結果を記録</button>`
-                    : `<span class="btn-secondary disabled-btn">結果未記録</span>`);
-
-            const players = match.players;
-            tableHtml += `
-                <tr data-match-id="${match.id}" data-table="${match.table_number}">
-                    <td>テーブル ${match.table_number}</td>
-                    <td class="player-cell" data-player-id="${players[0]?.id || ''}" data-slot="0">${escapeHtml(players[0]?.name || 'BYE')}</td>
-                    <td class="player-cell" data-player-id="${players[1]?.id || ''}" data-slot="1">${escapeHtml(players[1]?.name || 'BYE')}</td>
-                    <td class="player-cell" data-player-id="${players[2]?.id || ''}" data-slot="2">${escapeHtml(players[2]?.name || 'BYE')}</td>
-                    <td class="player-cell" data-player-id="${players[3]?.id || ''}" data-slot="3">${escapeHtml(players[3]?.name || 'BYE')}</td>
-                    <td>${resultHtml}</td>
-                </tr>
-            `;
+            tableHtml += renderMatchRow(match);
         });
 
         tableHtml += '</tbody></table></div>';
@@ -506,13 +508,48 @@ async function viewRoundMatches(roundId) {
 
         // 展開状態を復元
         if (allResultsExpanded) {
-            await expandAllResults();
+            await expandAllResults(roundId);
         }
     } catch (error) {
         console.error('試合読み込みエラー:', error);
     }
 }
 
+// 試合一覧の1テーブル分の行HTML
+function renderMatchRow(match) {
+    const resultHtml = renderResultCell(match.id, match.completed);
+
+    const players = match.players;
+    return `
+                <tr data-match-id="${match.id}" data-table="${match.table_number}">
+                    <td>テーブル ${match.table_number}</td>
+                    <td class="player-cell" data-player-id="${players[0]?.id || ''}" data-slot="0">${escapeHtml(players[0]?.name || 'BYE')}</td>
+                    <td class="player-cell" data-player-id="${players[1]?.id || ''}" data-slot="1">${escapeHtml(players[1]?.name || 'BYE')}</td>
+                    <td class="player-cell" data-player-id="${players[2]?.id || ''}" data-slot="2">${escapeHtml(players[2]?.name || 'BYE')}</td>
+                    <td class="player-cell" data-player-id="${players[3]?.id || ''}" data-slot="3">${escapeHtml(players[3]?.name || 'BYE')}</td>
+                    <td>${resultHtml}</td>
+                </tr>
+            `;
+}
+
+// 試合一覧の「結果」列のHTML
+function renderResultCell(matchId, completed) {
+    const isAdmin = currentUser && currentUser.is_admin;
+    return completed
+        ? (isAdmin
+            ? `
+            <button class="btn-edit" onclick="editMatchResults(${matchId})">結果修正</button>
+            <button class="btn-secondary" onclick="showMatchHistory(${matchId})">結果履歴</button>
+          `
+            : `
+            <span class="btn-secondary disabled-btn">結果記録済み</span>
+            <button class="btn-secondary" onclick="showMatchHistory(${matchId})">結果履歴</button>
+          `)
+        : (isAdmin
+            ? `<button class="btn-secondary" onclick="showMatchResults(${matchId})">結果を記録</button>`
+            : `<span class="btn-secondary disabled-btn">結果未記録</span>`);
+}
+
 async function showMatchHistory(matchId) {
     try {
         const response = await fetch(`/api/matches/${matchId}`);
@@ -691,7 +728,7 @@ async function submitMatchResults() {
 
 async function refreshStandings() {
     try {
-        const response = await fetch('/api/standings');
+        const response = await fetchWithEtag('/api/standings');
         const standings = await response.json();
 
         const tbody = document.getElementById('standings-body');
@@ -751,15 +788,25 @@ function toggleExpandAllResults(roundId) {
     const btn = document.getElementById('expand-all-btn');
     if (allResultsExpanded) {
         btn.textContent = '結果を折りたたむ';
-        expandAllResults();
+        expandAllResults(roundId);
     } else {
         btn.textContent = '全結果を展開';
         document.querySelectorAll('.inline-results-row').forEach(r => r.remove());
     }
 }
 
-// 全試合の結果をインライン表示
-async function expandAllResults() {
+// 全試合の結果をインライン表示（ラウンド全体を1回のリクエストで取得）
+async function expandAllResults(roundId) {
+    let round;
+    try {
+        const response = await fetchWithEtag(`/api/rounds/${roundId}/full`);
+        round = await response.json();
+    } catch (e) {
+        console.error('結果取得エラー:', e);
+        return;
+    }
+    const matchesById = new Map((round.matches || []).map(m => [String(m.id), m]));
+
     const matchRows = document.querySelectorAll('#matches-container tr[data-match-id]');
     for (const row of matchRows) {
         const matchId = row.dataset.matchId;
@@ -768,33 +815,157 @@ async function expandAllResults() {
         const existing = document.getElementById(`inline-results-${matchId}`);
         if (existing) existing.remove();
 
-        try {
-            const response = await fetch(`/api/matches/${matchId}`);
-            const match = await response.json();
-
-            const players = match.players.filter(p => p.id && p.id > 0);
-            let hasUnrecorded = false;
-            const resultsHtml = players.map(p => {
-                    const result = match.results.find(r => r.player_id === p.id);
-                    if (!result) hasUnrecorded = true;
-                    const resultText = result
-                        ? `勝:${result.win} 負:${result.loss} 分:${result.draw} ${result.points}pt`
-                        : '⚠ 未記録';
-                    const cls = result ? 'inline-result-item' : 'inline-result-item unrecorded';
-                    return `<span class="${cls}"><strong>${escapeHtml(p.name)}</strong>: ${resultText}</span>`;
-                }).join('');
-
-            const inlineRow = document.createElement('tr');
-            inlineRow.id = `inline-results-${matchId}`;
-            inlineRow.className = 'inline-results-row' + (hasUnrecorded ? ' has-unrecorded' : '');
-            inlineRow.innerHTML = `<td colspan="6" class="inline-results-cell">${resultsHtml || '未記録'}</td>`;
-            row.insertAdjacentElement('afterend', inlineRow);
-        } catch (e) {
-            console.error('結果取得エラー:', e);
+        const match = matchesById.get(matchId);
+        if (!match) continue;
+
+        const players = match.players.filter(p => p.id && p.id > 0);
+        let hasUnrecorded = false;
+        const resultsHtml = players.map(p => {
+                const result = match.results.find(r => r.player_id === p.id);
+                if (!result) hasUnrecorded = true;
+                const resultText = result
+                    ? `勝:${result.win} 負:${result.loss} 分:${result.draw} ${result.points}pt`
+                    : '⚠ 未記録';
+                const cls = result ? 'inline-result-item' : 'inline-result-item unrecorded';
+                return `<span class="${cls}"><strong>${escapeHtml(p.name)}</strong>: ${resultText}</span>`;
+            }).join('');
+
+        const inlineRow = document.createElement('tr');
+        inlineRow.id = `inline-results-${matchId}`;
+        inlineRow.className = 'inline-results-row' + (hasUnrecorded ? ' has-unrecorded' : '');
+        inlineRow.innerHTML = `<td colspan="6" class="inline-results-cell">${resultsHtml || '未記録'}</td>`;
+        row.insertAdjacentElement('afterend', inlineRow);
+    }
+}
+
+// SSE 通知が続けて届いても、再取得は最後の通知から少し待って一度にまとめる
+const REFRESH_DELAY_MS = 1000;
+const pendingRefreshes = new Set();
+let refreshTimer = null;
+
+function scheduleRefresh(...kinds) {
+    kinds.forEach(kind => pendingRefreshes.add(kind));
+    clearTimeout(refreshTimer);
+    refreshTimer = setTimeout(runScheduledRefreshes, REFRESH_DELAY_MS);
+}
+
+function runScheduledRefreshes() {
+    refreshTimer = null;
+    const kinds = new Set(pendingRefreshes);
+    pendingRefreshes.clear();
+    if (kinds.has('standings')) refreshStandings();
+    if (kinds.has('participants')) loadParticipants();
+    if (kinds.has('participantList')) loadParticipantList();
+    // 組み合わせ編集中は一覧を差し替えない
+    if (kinds.has('rounds') && !editPairingState.active) {
+        if (document.querySelector('.round-list-item.selected')) {
+            refreshMatchesInContainer();
+        } else {
+            refreshMatches();
         }
     }
 }
 
+// SSE を受けられない間（ワーカーの接続数上限など）はデータバージョンの変化をポーリングで検知
+const EVENTS_POLL_INTERVAL_MS = 20000;
+const EVENTS_RETRY_INTERVAL_MS = 60000;
+let eventsPollTimer = null;
+
+function startEventsPolling() {
+    if (eventsPollTimer) return;
+    eventsPollTimer = setInterval(async () => {
+        // ETag はデータバージョンなので、順位の ETag が変われば何かが更新されている
+        const before = etagCache.get('/api/standings')?.etag;
+        await refreshStandings();
+        const after = etagCache.get('/api/standings')?.etag;
+        if (before && after !== before) {
+            scheduleRefresh('participants', 'participantList', 'rounds');
+        }
+    }, EVENTS_POLL_INTERVAL_MS);
+}
+
+function stopEventsPolling() {
+    clearInterval(eventsPollTimer);
+    eventsPollTimer = null;
+}
+
+// サーバーからの変更通知（SSE）を受けて、表示中の一覧をその場で更新
+function connectEvents() {
+    if (!window.EventSource || !currentUser) return;
+    const source = new EventSource('/api/events');
+
+    source.addEventListener('open', stopEventsPolling);
+    // 503 などで接続が閉じられた場合はブラウザが再接続しないので、ポーリングに切り替える
+    source.addEventListener('error', () => {
+        if (source.readyState !== EventSource.CLOSED) return;
+        startEventsPolling();
+        setTimeout(connectEvents, EVENTS_RETRY_INTERVAL_MS);
+    });
+
+    // 結果登録: 該当テーブルの結果列とラウンドの削除可否を更新し、順位を再取得
+    const showRecordedResult = matchId => {
+        const row = document.querySelector(`#matches-container tr[data-match-id="${matchId}"]`);
+        if (row) {
+            row.lastElementChild.innerHTML = renderResultCell(matchId, true);
+        }
+    };
+    const lockRoundDeletion = roundId => {
+        const item = document.querySelector(`.round-list-item[data-round-id="${roundId}"]`);
+        if (item && item.dataset.canDelete !== 'false') {
+            item.dataset.canDelete = 'false';
+            if (item.classList.contains('selected')) {
+                document.getElementById('delete-round-btn').style.display = 'none';
+                document.getElementById('edit-pairing-btn').style.display = 'none';
+            }
+        }
+    };
+    source.addEventListener('match_result', e => {
+        const event = JSON.parse(e.data);
+        showRecordedResult(event.match_id);
+        lockRoundDeletion(event.round_id);
+        scheduleRefresh('standings', 'participants');
+    });
+    // 一括登録: 1件の通知で複数テーブルとラウンドをまとめて更新
+    source.addEventListener('results_batch', e => {
+        const event = JSON.parse(e.data);
+        event.match_ids.forEach(showRecordedResult);
+        event.round_ids.forEach(lockRoundDeletion);
+        scheduleRefresh('standings', 'participants');
+    });
+
+    // ラウンドのフリーズ切り替え: ラウンドリストの表示を更新
+    source.addEventListener('round_frozen', e => {
+        const event = JSON.parse(e.data);
+        const item = document.querySelector(`.round-list-item[data-round-id="${event.round_id}"]`);
+        if (!item) return;
+        item.dataset.isFrozen = event.is_frozen;
+        item.textContent = `第${item.dataset.roundNumber}ラウンド${event.is_frozen ? ' 🔒' : ''}`;
+        if (item.classList.contains('selected') && currentUser && currentUser.is_admin) {
+            const freezeBtn = document.getElementById('freeze-round-btn');
+            freezeBtn.textContent = event.is_frozen ? 'フリーズ解除' : 'このラウンドをフリーズ';
+            freezeBtn.className = event.is_frozen ? 'btn-secondary' : 'btn-warning';
+        }
+    });
+
+    // ラウンド作成・削除、組み合わせ変更: 編集中でなければ試合一覧を更新
+    source.addEventListener('round_created', () => scheduleRefresh('rounds'));
+    source.addEventListener('round_deleted', () => scheduleRefresh('rounds'));
+    source.addEventListener('seats_changed', e => {
+        const event = JSON.parse(e.data);
+        if (document.querySelector(`#matches-container tr[data-match-id="${event.match_id}"]`)) {
+            scheduleRefresh('rounds');
+        }
+    });
+
+    // 参加者の追加・削除・承認、全データ削除: 参加者と順位を再取得
+    source.addEventListener('participants_changed', () => {
+        scheduleRefresh('participants', 'participantList', 'standings');
+    });
+    source.addEventListener('cleared', () => {
+        scheduleRefresh('participants', 'participantList', 'standings', 'rounds');
+    });
+}
+
 // ラウンドリストを再読み込み（削除時などに使用）
 async function loadRounds() {
     await loadRoundSelect();
@@ -804,7 +975,7 @@ async function loadRounds() {
 async function loadRoundSelect() {
     const list = document.getElementById('round-list');
     try {
-        const response = await fetch('/api/rounds');
+        const response = await fetchWithEtag('/api/rounds');
         const rounds = await response.json();
 
         // リストをクリア
@@ -1005,8 +1176,10 @@ async function swapPlayers() {
         return;
     }
 
+    const roundId = document.querySelector('.round-list-item.selected').dataset.roundId;
+
     try {
-        // 異なるテーブルの場合は個別に更新、同じテーブルの場合は一括更新
+        // 同じテーブル内はマッチ単位、異なるテーブル間はラウンド単位の swap API で入れ替え
         if (player1.matchId === player2.matchId && player1.slot !== player2.slot) {
             // 同じテーブル内で入れ替え
             const response = await fetch(`/api/matches/${player1.matchId}/swap`, {
@@ -1025,15 +1198,17 @@ async function swapPlayers() {
                 return;
             }
         } else {
-            // 異なるテーブルの場合は、それぞれのスロットを更新
-            // まずplayer1を空にしてからplayer2を移動、その後player1を追加
-            await swapPlayersAcrossTables(player1, player2);
+            // 異なるテーブルの場合は、両テーブルを一括で入れ替え
+            await swapPlayersAcrossTables(player1, player2, roundId);
+            alert('入れ替えが完了しました。');
+            resetEditSelection();
+            return;
         }
 
         alert('入れ替えが完了しました。');
         resetEditSelection();
         // マッチリストを再読み込み
-        await viewRoundMatches(document.querySelector('.round-list-item.selected').dataset.roundId);
+        await viewRoundMatches(roundId);
     } catch (error) {
         console.error('プレイヤー入れ替えエラー:', error);
         alert('入れ替え中にエラーが発生しました。');
@@ -1041,58 +1216,29 @@ async function swapPlayers() {
     }
 }
 
-// 異なるテーブル間のプレイヤー入れ替え
-async function swapPlayersAcrossTables(player1, player2) {
-    // 各マッチのデータを取得
-    const response1 = await fetch(`/api/matches/${player1.matchId}`);
-    const match1 = await response1.json();
-
-    const response2 = await fetch(`/api/matches/${player2.matchId}`);
-    const match2 = await response2.json();
-
-    // プレイヤーIDを取得（BYEはnullとして扱う）
-    const player1Id = player1.playerId;
-    const player2Id = player2.playerId;
-
-    // slot -> player_id のマッピング
-    const slotToField = {
-        0: 'player1_id',
-        1: 'player2_id',
-        2: 'player3_id',
-        3: 'player4_id'
-    };
-
-    // マッチ1のスロット1を空にする（プレイヤー2をそこに移す）
-    // マッチ2のスロット2を空にする（プレイヤー1をそこに移す）
-
-    // マッチ1: player1のスロットをプレイヤー2に変更
-    let response = await fetch(`/api/matches/${player1.matchId}/update`, {
+// 異なるテーブル間のプレイヤー入れ替え（1リクエスト・1トランザクション）
+// 更新後の両テーブルが返るので、その行だけ描き直す
+async function swapPlayersAcrossTables(player1, player2, roundId) {
+    const response = await fetch(`/api/rounds/${roundId}/swap`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
-            slot: player1.slot,
-            player_id: player2Id
+            a: { match_id: parseInt(player1.matchId), slot: player1.slot, player_id: parseInt(player1.playerId) },
+            b: { match_id: parseInt(player2.matchId), slot: player2.slot, player_id: parseInt(player2.playerId) }
         })
     });
 
+    const data = await response.json();
     if (!response.ok) {
-        const error = await response.json();
-        throw new Error(error.error || '入れ替えに失敗しました');
+        throw new Error(data.error || '入れ替えに失敗しました');
     }
 
-    // マッチ2: player2のスロットをプレイヤー1に変更
-    response = await fetch(`/api/matches/${player2.matchId}/update`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-            slot: player2.slot,
-            player_id: player1Id
-        })
+    data.matches.forEach(match => {
+        const row = document.querySelector(`#matches-container tr[data-match-id="${match.id}"]`);
+        if (row) row.outerHTML = renderMatchRow(match);
     });
-
-    if (!response.ok) {
-        const error = await response.json();
-        throw new Error(error.error || '入れ替えに失敗しました');
+    if (allResultsExpanded) {
+        await expandAllResults(roundId);
     }
 }
 
@@ -1116,7 +1262,7 @@ function selectFirstRound() {
 async function loadParticipantList() {
     const list = document.getElementById('participant-list');
     try {
-        const response = await fetch('/api/participants');
+        const response = await fetchWithEtag('/api/participants');
         const participants = await response.json();
 
         // リストをクリア
@@ -1593,7 +1739,7 @@ async function showMatchResults(matchId) {
     const roundId = selected.dataset.roundId;
 
     try {
-        const matchResponse = await fetch(`/api/matches/round/${roundId}`);
+        const matchResponse = await fetchWithEtag(`/api/matches/round/${roundId}`);
         const matchData = await matchResponse.json();
         const match = matchData.matches.find(m => m.id === matchId);
 
@@ -1,84 +1,234 @@
 """Swiss-system pairing algorithm for Pokemon TCG tournaments."""
 
 import random
+import time
 from collections import defaultdict
-from itertools import combinations
-from models import Participant, Match, Round, MatchResult, User, db
+from flask import current_app
+from sqlalchemy import insert
+from models import Participant, Match, MatchSeat, Round, MatchResult, User, db
+import cache
+import engine_config
+import events
+
+# Default seconds generate_swiss_matches may spend improving table
+# assignments; the PAIRING_TIME_BUDGET config key overrides it
+PAIRING_TIME_BUDGET = 0.5
+
+# (data_version, (matches, round_number)) of the latest get_active_matches() call
+_active_matches_cache = None
+
+
+def get_standings_with_stats():
+    """Get standings rows sorted by wins (desc), then points (desc).
+
+    Totals are read from the counters kept on Participant (see
+    apply_result_delta), so this is a single query with no aggregation.
+    Only includes participants linked to approved users. Each row is a dict
+    with the participant and its win_count/loss_count/draw_count/points.
+    """
+    win_count = db.func.coalesce(Participant.win_count, 0)
+    points = db.func.coalesce(Participant.points, 0)
+
+    # Participants linked to approved users
+    approved_ids = db.session.query(User.participant_id).filter(
+        User.is_approved == True,
+        User.participant_id != None
+    )
+    participants = Participant.query.filter(
+        Participant.id.in_(approved_ids)
+    ).order_by(
+        win_count.desc(), points.desc(), Participant.id
+    ).all()
+
+    return [{
+        'participant': p,
+        'win_count': p.win_count or 0,
+        'loss_count': p.loss_count or 0,
+        'draw_count': p.draw_count or 0,
+        'points': p.points or 0
+    } for p in participants]
+
+
+def apply_result_delta(player_id, win=0, loss=0, draw=0, points=0):
+    """Add deltas to a participant's standings counters.
+
+    Runs as a single UPDATE in the caller's transaction, so the counters
+    commit (or roll back) together with the MatchResult rows they mirror.
+    Pending MatchResult rows are not flushed here; unique-constraint
+    conflicts still surface at the caller's commit.
+    """
+    if not (win or loss or draw or points):
+        return
+    with db.session.no_autoflush:
+        Participant.query.filter(Participant.id == player_id).update({
+            Participant.win_count: db.func.coalesce(Participant.win_count, 0) + win,
+            Participant.loss_count: db.func.coalesce(Participant.loss_count, 0) + loss,
+            Participant.draw_count: db.func.coalesce(Participant.draw_count, 0) + draw,
+            Participant.points: db.func.coalesce(Participant.points, 0) + points
+        }, synchronize_session=False)
+
+
+def reverse_match_results(match_results):
+    """Subtract MatchResult rows from their players' standings counters."""
+    for r in match_results:
+        apply_result_delta(r.player_id, -(r.win or 0), -(r.loss or 0),
+                           -(r.draw or 0), -(r.points or 0))
+
+
+def reconcile_standings():
+    """Rebuild every participant's standings counters from match_results."""
+    def total(column):
+        return db.session.query(
+            db.func.coalesce(db.func.sum(column), 0)
+        ).filter(MatchResult.player_id == Participant.id).scalar_subquery()
+
+    Participant.query.update({
+        Participant.win_count: total(MatchResult.win),
+        Participant.loss_count: total(MatchResult.loss),
+        Participant.draw_count: total(MatchResult.draw),
+        Participant.points: total(MatchResult.points)
+    }, synchronize_session=False)
+    db.session.commit()
+    # 順位が変わりうるのでキャッシュを無効化し、表示中のクライアントにも再取得させる
+    events.publish('participants_changed')
 
 
 def get_standings():
     """Get participants sorted by wins (desc), then points (desc).
-    Calculates totals across all rounds from MatchResult table.
     Only includes participants linked to approved users."""
-    from models import MatchResult
-
-    # Get participants linked to approved users
-    participants = Participant.query.join(User).filter(User.is_approved == True).all()
-
-    # Calculate totals from MatchResult for each participant
-    participants_with_stats = []
-    for p in participants:
-        # Sum up all results from all rounds
-        stats = db.session.query(
-            db.func.coalesce(db.func.sum(MatchResult.win), 0).label('total_win'),
-            db.func.coalesce(db.func.sum(MatchResult.loss), 0).label('total_loss'),
-            db.func.coalesce(db.func.sum(MatchResult.draw), 0).label('total_draw'),
-            db.func.coalesce(db.func.sum(MatchResult.points), 0).label('total_points')
-        ).filter(MatchResult.player_id == p.id).first()
-
-        participants_with_stats.append({
-            'participant': p,
-            'win_count': stats.total_win,
-            'loss_count': stats.total_loss,
-            'draw_count': stats.total_draw,
-            'points': stats.total_points
-        })
-
-    # Sort by wins (desc), then points (desc)
-    participants_with_stats.sort(key=lambda x: (-x['win_count'], -x['points']))
+    return [row['participant'] for row in get_standings_with_stats()]
 
-    return [p['participant'] for p in participants_with_stats]
 
+def create_round(round_number, commit=True):
+    """Create a new round if it doesn't exist.
 
-def create_round(round_number):
-    """Create a new round if it doesn't exist."""
+    With commit=False the row is only flushed (so it has an id) and is
+    committed together with the caller's later writes.
+    """
     existing_round = Round.query.filter_by(round_number=round_number).first()
     if existing_round:
         return existing_round
 
     new_round = Round(round_number=round_number)
     db.session.add(new_round)
+    if not commit:
+        db.session.flush()
+        return new_round
     db.session.commit()
+    cache.bump_data_version()
     return new_round
 
 
-def get_past_opponents(player_id, round_number):
-    """Get list of opponent player IDs this player has faced before current round."""
-    from models import Match, MatchResult
-
-    opponents = set()
+def build_opponent_index(round_number):
+    """Build an opponent-history index for every player before the given round.
 
-    # Get all matches from previous rounds where this player participated
-    previous_matches = db.session.query(Match).join(Round).filter(
+    Loads the seats of all earlier matches with a single query and returns
+    a dict mapping player ID to a frozenset of opponent IDs, so pairing can
+    check rematches without touching the database.
+    """
+    rows = db.session.query(
+        MatchSeat.match_id, MatchSeat.participant_id
+    ).join(Match, Match.id == MatchSeat.match_id).join(Round).filter(
         Round.round_number < round_number
-    ).filter(
-        db.or_(
-            Match.player1_id == player_id,
-            Match.player2_id == player_id,
-            Match.player3_id == player_id,
-            Match.player4_id == player_id
-        )
     ).all()
 
-    for match in previous_matches:
-        for pid in [match.player1_id, match.player2_id, match.player3_id, match.player4_id]:
-            if pid and pid != player_id:
-                opponents.add(pid)
+    tables = defaultdict(list)
+    for match_id, participant_id in rows:
+        tables[match_id].append(participant_id)
+
+    opponents = defaultdict(set)
+    for seated in tables.values():
+        for pid in seated:
+            opponents[pid].update(other for other in seated if other != pid)
+
+    return {pid: frozenset(others) for pid, others in opponents.items()}
+
+
+def count_conflicts(player_id, table, opponent_index):
+    """Count the players at a table that player_id has already faced."""
+    past = opponent_index.get(player_id, ())
+    return sum(1 for other in table if other != player_id and other in past)
+
 
-    return opponents
+def assign_tables(player_ids, opponent_index, deadline=None):
+    """Split players into tables of 4 with as few rematches as possible.
 
+    The players are shuffled first, then seated greedily in that random
+    order: each table starts from the next unseated player and is filled
+    with the first players who add the fewest rematches. This seeding
+    always runs to completion (O(n^2)). A local search then swaps players
+    between tables while that lowers the total rematch count, until no swap
+    helps or ``deadline`` (a time.perf_counter() value) passes; the
+    deadline only limits this swap phase.
 
-def generate_swiss_matches(round_number):
+    Returns full tables of 4 followed by one table holding the
+    len(player_ids) % 4 players left over, if any.
+    """
+    pool = list(player_ids)
+    random.shuffle(pool)
+    tables = []
+
+    # Greedy seeding: O(n^2) overall
+    while len(pool) >= 4:
+        table = [pool.pop(0)]
+        while len(table) < 4:
+            best_index = None
+            best_conflicts = None
+            for index, candidate in enumerate(pool):
+                conflicts = count_conflicts(candidate, table, opponent_index)
+                if best_conflicts is None or conflicts < best_conflicts:
+                    best_index, best_conflicts = index, conflicts
+                    if conflicts == 0:
+                        break
+            table.append(pool.pop(best_index))
+        tables.append(table)
+    if pool:
+        tables.append(pool)
+
+    # Local search: swap two players at different tables when it removes rematches
+    improved = True
+    while improved:
+        improved = False
+        conflicted = [
+            (t, i) for t, table in enumerate(tables)
+            for i, pid in enumerate(table)
+            if count_conflicts(pid, table, opponent_index) > 0
+        ]
+        if not conflicted:
+            break
+        random.shuffle(conflicted)
+
+        for t1, i1 in conflicted:
+            if deadline is not None and time.perf_counter() > deadline:
+                return tables
+            table1 = tables[t1]
+            a = table1[i1]
+            rest1 = [pid for pid in table1 if pid != a]
+            cost_a = count_conflicts(a, rest1, opponent_index)
+            if cost_a == 0:
+                continue
+
+            for t2 in random.sample(range(len(tables)), len(tables)):
+                if t2 == t1:
+                    continue
+                table2 = tables[t2]
+                swapped = False
+                for i2, b in enumerate(table2):
+                    rest2 = [pid for pid in table2 if pid != b]
+                    before = cost_a + count_conflicts(b, rest2, opponent_index)
+                    after = (count_conflicts(b, rest1, opponent_index) +
+                             count_conflicts(a, rest2, opponent_index))
+                    if after < before:
+                        table1[i1], table2[i2] = b, a
+                        improved = swapped = True
+                        break
+                if swapped:
+                    break
+
+    return tables
+
+
+def generate_swiss_matches(round_number, opponent_index=None, time_budget=None):
     """Generate match pairings using Swiss-system algorithm.
 
     Players are paired based on their points. Players with same points
@@ -86,15 +236,25 @@ def generate_swiss_matches(round_number):
     Multiple tables are created if there are more than 4 players.
 
     This implementation tries to avoid rematching players who have
-    already faced each other in previous rounds.
+    already faced each other in previous rounds. The opponent history is
+    taken from ``opponent_index`` (see build_opponent_index) and is loaded
+    once up front when not given, so no SQL runs while pairing.
+
+    Tables within each point group are seated by assign_tables, which runs
+    in polynomial time; ``time_budget`` (seconds, defaults to the
+    PAIRING_TIME_BUDGET config value) caps its swap phase, shared across
+    all point groups. The greedy seeding is not limited by it.
     """
-    participants = get_standings()
+    standings = get_standings_with_stats()
+
+    if opponent_index is None:
+        opponent_index = build_opponent_index(round_number)
 
     participants_with_points = []
-    for p in participants:
+    for row in standings:
         participants_with_points.append({
-            'participant': p,
-            'points': p.points
+            'participant': row['participant'],
+            'points': row['points']
         })
 
     # Sort by points (desc)
@@ -129,79 +289,27 @@ def generate_swiss_matches(round_number):
     for p in participants_with_points:
         by_points[p['points']].append(p['participant'].id)
 
+    # Shared deadline for the local-search phase of every point group
+    if time_budget is None:
+        time_budget = current_app.config.get('PAIRING_TIME_BUDGET', PAIRING_TIME_BUDGET)
+    deadline = time.perf_counter() + time_budget
+
     # Process each point group
     for points in sorted(by_points.keys(), reverse=True):
         player_ids = by_points[points]
 
-        unpaired_in_group = set(player_ids)
-
-        while len(unpaired_in_group) >= 4:
-            # Try to find 4 players who haven't played each other
-            best_groups = []
-            min_past_matches = float('inf')
-
-            # Get all combinations of 4 from unpaired players
-            for combo in combinations(unpaired_in_group, 4):
-                # Count how many past matches exist within this group
-                past_count = 0
-                for p1, p2 in combinations(combo, 2):
-                    if p2 in get_past_opponents(p1, round_number):
-                        past_count += 1
-
-                if past_count < min_past_matches:
-                    min_past_matches = past_count
-                    best_groups = [combo]
-                elif past_count == min_past_matches:
-                    best_groups.append(combo)
-
-            # If multiple groups have the same past_count, choose randomly
-            if best_groups:
-                best_group = random.choice(best_groups)
-                matches.append({
-                    'table_number': table_number,
-                    'player_ids': list(best_group)
-                })
-                for pid in best_group:
-                    unpaired_in_group.discard(pid)
-                    paired.add(pid)
-                table_number += 1
-            else:
-                # If no clean combination, shuffle remaining players and take 4
-                remaining_list = list(unpaired_in_group)
-                random.shuffle(remaining_list)
-                group = remaining_list[:4]
-                matches.append({
-                    'table_number': table_number,
-                    'player_ids': group
-                })
-                for pid in group:
-                    unpaired_in_group.discard(pid)
-                    paired.add(pid)
-                table_number += 1
-
-        # Handle remaining players (3, 2, or 1)
-        remaining = list(unpaired_in_group)
-        if len(remaining) >= 3:
+        # Seat full tables of 4, then the 3 or 2 players left over as one
+        # more table. A single leftover player is mixed with other groups below.
+        for group in assign_tables(player_ids, opponent_index, deadline):
+            if len(group) < 2:
+                continue
             matches.append({
                 'table_number': table_number,
-                'player_ids': remaining
+                'player_ids': group
             })
-            for pid in remaining:
+            for pid in group:
                 paired.add(pid)
             table_number += 1
-            unpaired_in_group = set()
-        elif len(remaining) >= 2:
-            matches.append({
-                'table_number': table_number,
-                'player_ids': remaining
-            })
-            for pid in remaining:
-                paired.add(pid)
-            table_number += 1
-            unpaired_in_group = set()
-        elif len(remaining) == 1:
-            # Single player - will be handled below
-            pass
 
     # Handle any unpaired players from all groups by mixing point groups
     unpaired_all = [p['participant'].id for p in participants_with_points
@@ -210,15 +318,19 @@ def generate_swiss_matches(round_number):
     # Shuffle to add randomness when mixing point groups
     random.shuffle(unpaired_all)
 
-    while len(unpaired_all) >= 4:
-        group = unpaired_all[:4]
+    tables = assign_tables(unpaired_all, opponent_index, deadline)
+    if tables and len(tables[-1]) < 4:
+        unpaired_all = tables.pop()
+    else:
+        unpaired_all = []
+
+    for group in tables:
         matches.append({
             'table_number': table_number,
             'player_ids': group
         })
         for pid in group:
             paired.add(pid)
-        unpaired_all = unpaired_all[4:]
         table_number += 1
 
     if len(unpaired_all) >= 2:
@@ -244,35 +356,81 @@ def generate_swiss_matches(round_number):
 
 
 def save_matches_to_db(matches, round_id):
-    """Save generated matches to the database."""
-    for match_data in matches:
-        player_ids = match_data['player_ids']
+    """Save generated matches to the database and commit.
 
+    All tables are written with one bulk INSERT ... RETURNING (plus one for
+    their match_seats rows), together with anything already pending in the
+    session such as the new Round. Sets ``match_data['id']`` on each entry
+    of ``matches`` and returns the list of new match IDs.
+    """
+    rows = []
+    for match_data in matches:
         # Filter out BYE entries (negative IDs) for database storage
         # Only real players (positive IDs) are stored in DB
-        real_player_ids = [pid for pid in player_ids if pid > 0]
-
-        match = Match(
-            round_id=round_id,
-            table_number=match_data['table_number'],
-            player1_id=real_player_ids[0] if len(real_player_ids) > 0 else None,
-            player2_id=real_player_ids[1] if len(real_player_ids) > 1 else None,
-            player3_id=real_player_ids[2] if len(real_player_ids) > 2 else None,
-            player4_id=real_player_ids[3] if len(real_player_ids) > 3 else None
-        )
-        db.session.add(match)
+        real_player_ids = [pid for pid in match_data['player_ids'] if pid > 0]
+        seats = (real_player_ids + [None] * 4)[:4]
+        rows.append({
+            'round_id': round_id,
+            'table_number': match_data['table_number'],
+            'player1_id': seats[0],
+            'player2_id': seats[1],
+            'player3_id': seats[2],
+            'player4_id': seats[3],
+        })
+
+    ids_by_table = {}
+    if rows:
+        # RETURNING の行順は保証されないので、ラウンド内で一意な卓番号で対応付ける
+        ids_by_table = dict(db.session.execute(
+            insert(Match).returning(Match.table_number, Match.id),
+            rows,
+            # 空席(None)の有無で文を分けず、全卓を1文にまとめる
+            execution_options={'render_nulls': True}
+        ).all())
+
+        seat_rows = [
+            {'match_id': ids_by_table[row['table_number']], 'seat': seat,
+             'participant_id': row[f'player{seat}_id']}
+            for row in rows
+            for seat in range(1, 5) if row[f'player{seat}_id']
+        ]
+        if seat_rows:
+            db.session.execute(insert(MatchSeat), seat_rows)
+
+    match_ids = []
+    for match_data in matches:
+        match_data['id'] = ids_by_table[match_data['table_number']]
+        match_ids.append(match_data['id'])
 
     db.session.commit()
+    events.publish('round_created', round_id=round_id)
+    return match_ids
+
+
+def sync_match_seats(match):
+    """Rewrite a match's match_seats rows from its player1..player4 columns.
+
+    Call after changing the seating of an existing match, before commit.
+    """
+    MatchSeat.query.filter_by(match_id=match.id).delete()
+    seats = [match.player1_id, match.player2_id, match.player3_id, match.player4_id]
+    db.session.add_all([
+        MatchSeat(match_id=match.id, seat=seat, participant_id=pid)
+        for seat, pid in enumerate(seats, 1) if pid
+    ])
 
 
 def generate_next_round_matches():
     """Generate and save matches for the next round."""
+    # 同時に2回押されても同じラウンドを二重に作らないよう、先に書き込みロックを取る
+    engine_config.begin_write()
+
     # Get the current round number
     current_round = Round.query.order_by(Round.round_number.desc()).first()
     next_round_number = 1 if not current_round else current_round.round_number + 1
 
-    # Create round and generate matches
-    round_obj = create_round(next_round_number)
+    # Round, matches and seats are committed in one transaction
+    round_obj = create_round(next_round_number, commit=False)
     matches = generate_swiss_matches(next_round_number)
     save_matches_to_db(matches, round_obj.id)
 
@@ -280,32 +438,98 @@ def generate_next_round_matches():
 
 
 def get_matches_by_round(round_id):
-    """Get all matches from a specific round."""
-    matches = Match.query.filter_by(round_id=round_id).order_by(Match.table_number).all()
+    """Get all matches from a specific round.
+
+    The four player relationships are eager-loaded in the same query, so
+    serializing the players of every table needs no further SQL.
+    """
+    matches = Match.query.options(
+        db.joinedload(Match.player1),
+        db.joinedload(Match.player2),
+        db.joinedload(Match.player3),
+        db.joinedload(Match.player4)
+    ).filter_by(round_id=round_id).order_by(Match.table_number).all()
     return matches, None
 
 
-def get_match_with_results(match_id):
-    """Get a match with its results and player details."""
-    match = Match.query.get(match_id)
-    if not match:
-        return None, "Match not found"
+def serialize_match_summary(match):
+    """Serialize a match for the round listings.
+
+    Reads players through the Match.player1..player4 relationships, which
+    the listing queries eager-load, so no per-seat query is issued.
+    """
+    players = []
+    for player_id, p in [(match.player1_id, match.player1), (match.player2_id, match.player2),
+                         (match.player3_id, match.player3), (match.player4_id, match.player4)]:
+        if player_id:
+            players.append({'id': p.id, 'name': p.name} if p else {'id': None, 'name': 'TBD'})
+
+    return {
+        'id': match.id,
+        'table_number': match.table_number,
+        'players': players,
+        'completed': match.completed
+    }
+
+
+def get_active_matches():
+    """Get the tables of the latest round.
 
+    Returns (matches, round_number): serialized matches of the round with
+    the highest round_number, ordered by table, and that round's number
+    (None if there are no rounds). The matches, their round and players are
+    loaded in one query and the result is cached until the data version
+    changes (see cache.bump_data_version).
+    """
+    global _active_matches_cache
+    version = cache.get_data_version()
+    cached = _active_matches_cache
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    latest_round_number = db.session.query(db.func.max(Round.round_number)).scalar_subquery()
+    matches = Match.query.join(Round).options(
+        db.contains_eager(Match.round),
+        db.joinedload(Match.player1),
+        db.joinedload(Match.player2),
+        db.joinedload(Match.player3),
+        db.joinedload(Match.player4)
+    ).filter(
+        Round.round_number == latest_round_number
+    ).order_by(Match.table_number).all()
+
+    if matches:
+        round_number = matches[0].round.round_number
+    else:
+        # Latest round has no tables (or there are no rounds at all)
+        round_number = db.session.query(db.func.max(Round.round_number)).scalar()
+
+    result = ([serialize_match_summary(match) for match in matches], round_number)
+    _active_matches_cache = (version, result)
+    return result
+
+
+def serialize_match_with_results(match, match_results):
+    """Serialize a match with its players and per-player results.
+
+    ``match_results`` are the MatchResult rows of this match. Players are
+    read through the eager-loaded player1..player4 relationships.
+    """
+    results_by_player = {r.player_id: r for r in match_results}
     players = []
     result_data = []
 
-    for attr_name, player_id in [('player1', match.player1_id), ('player2', match.player2_id),
-                                  ('player3', match.player3_id), ('player4', match.player4_id)]:
+    for player_id, p in [(match.player1_id, match.player1), (match.player2_id, match.player2),
+                         (match.player3_id, match.player3), (match.player4_id, match.player4)]:
         if player_id:
             if player_id < 0:
                 # BYE player
                 players.append({'id': player_id, 'name': 'BYE'})
             else:
-                p = Participant.query.get(player_id)
                 players.append({'id': p.id, 'name': p.name} if p else {'id': None, 'name': 'TBD'})
 
                 # Get match result for this player
-                result = MatchResult.query.filter_by(match_id=match_id, player_id=player_id).first()
+                result = results_by_player.get(player_id)
                 if result:
                     result_data.append({
                         'player_id': player_id,
@@ -320,30 +544,52 @@ def get_match_with_results(match_id):
         'round_id': match.round_id,
         'table_number': match.table_number,
         'players': players,
-        'completed': match.result_json is not None,
+        'completed': match.completed,
         'results': result_data
-    }, None
+    }
 
 
-def process_match_results(match_id, results):
-    """Process new match results (for first-time recording)."""
-    from sqlalchemy.exc import IntegrityError
-
-    # with_for_update() により SQLite が BEGIN IMMEDIATE を発行し、
-    # 同時書き込みをシリアライズして競合状態を防ぐ
-    match = db.session.query(Match).filter(Match.id == match_id).with_for_update().first()
+def get_match_with_results(match_id):
+    """Get a match with its results and player details."""
+    match = Match.query.options(
+        db.joinedload(Match.player1),
+        db.joinedload(Match.player2),
+        db.joinedload(Match.player3),
+        db.joinedload(Match.player4)
+    ).filter(Match.id == match_id).first()
     if not match:
         return None, "Match not found"
 
-    # ロック取得後に最新状態を確認（他プレイヤーが先に登録済みでないかチェック）
-    if match.result_json is not None:
-        return None, "Results already recorded by another player"
+    return serialize_match_with_results(match, MatchResult.query.filter_by(match_id=match_id).all()), None
+
+
+def get_round_with_results(round_id):
+    """Get every match of a round with its players and per-player results.
+
+    Uses two queries regardless of the number of tables: the matches with
+    their players eager-loaded, and all MatchResult rows of the round.
+    """
+    matches, _ = get_matches_by_round(round_id)
+
+    results_by_match = defaultdict(list)
+    round_match_ids = db.session.query(Match.id).filter(Match.round_id == round_id)
+    for r in MatchResult.query.filter(MatchResult.match_id.in_(round_match_ids)).all():
+        results_by_match[r.match_id].append(r)
+
+    return [serialize_match_with_results(m, results_by_match[m.id]) for m in matches]
+
 
+def build_match_results(match, results):
+    """Build unsaved MatchResult rows for a match from submitted results.
+
+    Only seated players (BYE entries have negative IDs and are never stored)
+    with a non-empty result (any of win/loss/draw/points non-zero) get a row.
+    """
     # Get all player IDs involved in this match (exclude BYE which has negative IDs)
     player_ids = [match.player1_id, match.player2_id, match.player3_id, match.player4_id]
     player_ids = [p for p in player_ids if p is not None and p > 0]
 
-    # Save match results to MatchResult table (only for non-empty results)
+    match_results = []
     for player_id in player_ids:
         player_result = next((r for r in results if r['player_id'] == player_id), None)
         if player_result:
@@ -352,23 +598,47 @@ def process_match_results(match_id, results):
                     player_result.get('loss', 0) == 0 and
                     player_result.get('draw', 0) == 0 and
                     player_result.get('points', 0) == 0):
-                match_result = MatchResult(
-                    match_id=match_id,
+                match_results.append(MatchResult(
+                    match_id=match.id,
                     player_id=player_id,
                     win=player_result.get('win', 0),
                     loss=player_result.get('loss', 0),
                     draw=player_result.get('draw', 0),
                     points=player_result.get('points', 0)
-                )
-                db.session.add(match_result)
+                ))
+    return match_results
+
+
+def process_match_results(match_id, results):
+    """Process new match results (for first-time recording)."""
+    from sqlalchemy.exc import IntegrityError
+
+    # SQLite は with_for_update() を無視するため、BEGIN IMMEDIATE で
+    # 書き込みロックを先に取得し、同時書き込みをシリアライズして競合状態を防ぐ
+    engine_config.begin_write()
+    match = db.session.query(Match).filter(Match.id == match_id).with_for_update().first()
+    if not match:
+        return None, "Match not found"
+
+    # ロック取得後に最新状態を確認（他プレイヤーが先に登録済みでないかチェック）
+    if match.completed:
+        return None, "Results already recorded by another player"
+
+    # Save match results to MatchResult table (only for non-empty results)
+    for match_result in build_match_results(match, results):
+        db.session.add(match_result)
+        apply_result_delta(match_result.player_id, match_result.win, match_result.loss,
+                           match_result.draw, match_result.points)
 
     # Mark match as completed
-    match.result_json = str(results)
+    match.set_results(results)
+    round_id = match.round_id
     try:
         db.session.commit()
     except IntegrityError:
         db.session.rollback()
         return None, "Results already recorded (conflict)"
+    events.publish('match_result', match_id=match_id, round_id=round_id)
 
     return {}, None
 
@@ -377,44 +647,31 @@ def update_match_results(match_id, results):
     """Update match results (for editing). 管理者専用: 全プレイヤー結果を一括上書き。"""
     from sqlalchemy.exc import IntegrityError
 
-    # with_for_update() により同時更新の競合を防ぐ
+    # BEGIN IMMEDIATE で書き込みロックを取得して同時更新の競合を防ぐ
+    engine_config.begin_write()
     match = db.session.query(Match).filter(Match.id == match_id).with_for_update().first()
     if not match:
         return None, "Match not found"
 
-    # Delete existing results
+    # Delete existing results and take them back out of the standings counters
+    reverse_match_results(MatchResult.query.filter_by(match_id=match_id).all())
     MatchResult.query.filter_by(match_id=match_id).delete()
 
-    # Get all player IDs involved in this match (exclude BYE which has negative IDs)
-    player_ids = [match.player1_id, match.player2_id, match.player3_id, match.player4_id]
-    player_ids = [p for p in player_ids if p is not None and p > 0]
-
     # Save updated match results to MatchResult table (only for non-empty results)
-    for player_id in player_ids:
-        player_result = next((r for r in results if r['player_id'] == player_id), None)
-        if player_result:
-            # Skip if result is empty (no win/loss/draw and points is 0)
-            if not (player_result.get('win', 0) == 0 and
-                    player_result.get('loss', 0) == 0 and
-                    player_result.get('draw', 0) == 0 and
-                    player_result.get('points', 0) == 0):
-                match_result = MatchResult(
-                    match_id=match_id,
-                    player_id=player_id,
-                    win=player_result.get('win', 0),
-                    loss=player_result.get('loss', 0),
-                    draw=player_result.get('draw', 0),
-                    points=player_result.get('points', 0)
-                )
-                db.session.add(match_result)
+    for match_result in build_match_results(match, results):
+        db.session.add(match_result)
+        apply_result_delta(match_result.player_id, match_result.win, match_result.loss,
+                           match_result.draw, match_result.points)
 
     # Mark match as completed
-    match.result_json = str(results)
+    match.set_results(results)
+    round_id = match.round_id
     try:
         db.session.commit()
     except IntegrityError:
         db.session.rollback()
         return None, "Update conflict, please try again"
+    events.publish('match_result', match_id=match_id, round_id=round_id)
 
     return {}, None
 
@@ -422,12 +679,14 @@ def update_match_results(match_id, results):
 def update_player_result(match_id, player_id, result):
     """特定プレイヤーの結果だけをUPSERT（他プレイヤーの結果は変更しない）。
     非管理者が自分の結果のみ登録・修正する際に使用。"""
+    engine_config.begin_write()
     match = db.session.query(Match).filter(Match.id == match_id).with_for_update().first()
     if not match:
         return None, "Match not found"
 
     existing = MatchResult.query.filter_by(match_id=match_id, player_id=player_id).first()
     if existing:
+        reverse_match_results([existing])
         existing.win = result.get('win', 0)
         existing.loss = result.get('loss', 0)
         existing.draw = result.get('draw', 0)
@@ -443,6 +702,8 @@ def update_player_result(match_id, player_id, result):
         )
         db.session.add(new_result)
 
+    apply_result_delta(player_id, result.get('win', 0), result.get('loss', 0),
+                       result.get('draw', 0), result.get('points', 0))
     db.session.flush()
 
     # result_json を全MatchResultから再構築して完了フラグを更新
@@ -452,7 +713,108 @@ def update_player_result(match_id, player_id, result):
          'draw': r.draw, 'points': r.points}
         for r in all_results
     ]
-    match.result_json = str(result_json_data)
+    match.set_results(result_json_data)
+    round_id = match.round_id
 
     db.session.commit()
+    events.publish('match_result', match_id=match_id, round_id=round_id)
     return {}, None
+
+
+def _is_id(value):
+    # bool は int のサブクラスなので除外し、リストなどハッシュ不能な値も弾く
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _validate_batch_entry(entry, match, seen):
+    """Return an error message for one batch entry, or None if it is valid."""
+    if not _is_id(entry.get('match_id')):
+        return "match_id must be an integer"
+    if match is None:
+        return "Match not found"
+    if match.id in seen:
+        return "Duplicate match in batch"
+    results = entry.get('results')
+    if not isinstance(results, list):
+        return "results must be a list"
+
+    player_ids = {match.player1_id, match.player2_id, match.player3_id, match.player4_id} - {None}
+    submitted = set()
+    for r in results:
+        if not isinstance(r, dict) or not _is_id(r.get('player_id')) or r['player_id'] not in player_ids:
+            return "Result for a player not seated at this table"
+        if r['player_id'] in submitted:
+            return "Duplicate result for player %s" % r['player_id']
+        submitted.add(r['player_id'])
+        for key in ('win', 'loss', 'draw', 'points'):
+            value = r.get(key, 0)
+            if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+                return "%s must be a non-negative integer" % key
+    return None
+
+
+def record_results_batch(entries):
+    """Record results for many matches in a single write transaction.
+
+    ``entries`` is a list of {"match_id": ..., "results": [...]} in the same
+    shape /api/matches accepts. Every entry is validated first and nothing
+    is written if any is invalid. Otherwise new results are recorded and
+    existing ones replaced (as update_match_results does) in one commit.
+
+    Returns (statuses, ok): one {"match_id", "status"[, "error"]} dict per
+    entry in order, where status is "recorded", "updated" or "error".
+    """
+    engine_config.begin_write()
+
+    requested = [e.get('match_id') for e in entries if isinstance(e, dict)]
+    requested = [mid for mid in requested if _is_id(mid)]
+    matches = {m.id: m for m in Match.query.filter(Match.id.in_(requested)).all()}
+
+    statuses = []
+    seen = set()
+    for entry in entries:
+        if not isinstance(entry, dict):
+            statuses.append({'match_id': None, 'status': 'error', 'error': "Entry must be an object"})
+            continue
+        match_id = entry.get('match_id')
+        error = _validate_batch_entry(entry, matches.get(match_id) if _is_id(match_id) else None, seen)
+        if error:
+            statuses.append({'match_id': match_id, 'status': 'error', 'error': error})
+            continue
+        seen.add(match_id)
+        statuses.append({'match_id': match_id,
+                         'status': 'updated' if matches[match_id].completed else 'recorded'})
+
+    if not entries or any(st['status'] == 'error' for st in statuses):
+        db.session.rollback()
+        return statuses, False
+
+    # 取り消し分と新しい結果をプレイヤーごとに合算し、カウンタ更新は1人1回にまとめる
+    deltas = defaultdict(lambda: [0, 0, 0, 0])
+    old_rows = db.session.query(
+        MatchResult.player_id, MatchResult.win, MatchResult.loss, MatchResult.draw, MatchResult.points
+    ).filter(MatchResult.match_id.in_(seen)).all()
+    for player_id, *values in old_rows:
+        for i, value in enumerate(values):
+            deltas[player_id][i] -= value or 0
+    MatchResult.query.filter(MatchResult.match_id.in_(seen)).delete(synchronize_session=False)
+
+    for entry in entries:
+        match = matches[entry['match_id']]
+        for match_result in build_match_results(match, entry['results']):
+            db.session.add(match_result)
+            for i, value in enumerate((match_result.win, match_result.loss,
+                                       match_result.draw, match_result.points)):
+                deltas[match_result.player_id][i] += value
+        match.set_results(entry['results'])
+
+    for player_id, (win, loss, draw, points) in deltas.items():
+        apply_result_delta(player_id, win, loss, draw, points)
+
+    match_ids = [st['match_id'] for st in statuses]
+    round_ids = sorted({matches[match_id].round_id for match_id in seen})
+    db.session.commit()
+    # バッチ全体で通知1件・データバージョン更新1回にまとめる
+    events.publish('results_batch', match_ids=match_ids, round_ids=round_ids)
+
+    return statuses, True
@@ -0,0 +1,11 @@
+"""WSGI entry point for production serving.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Each worker builds its own app here; database initialization runs once in
+the gunicorn master (see on_starting in gunicorn.conf.py).
+"""
+
+from app import create_app
+
+application = create_app()